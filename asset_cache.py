@@ -0,0 +1,184 @@
+import hashlib
+import os
+import struct
+
+import pygame
+
+import assets
+from registry import REGISTRY
+
+def _default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "angka-anjlok", "assets")
+
+CACHE_DIR = os.environ.get("ANGKA_ASSET_CACHE", _default_cache_dir())
+CACHE_MAX_BYTES = int(float(os.environ.get("ANGKA_ASSET_CACHE_MB", "64")) * 1024 * 1024)
+
+# magic, assets.py version stamp, width, height, flags
+HEADER = struct.Struct("<4s16sIIB")
+MAGIC = b"AAC1"
+FLAG_ALPHA = 1
+ENTRY_SUFFIX = ".px"
+
+def source_version():
+    with open(assets.__file__, "rb") as f:
+        return hashlib.sha1(f.read()).digest()[:16]
+
+def surface_to_bytes(surf):
+    to_bytes = getattr(pygame.image, "tobytes", None) or pygame.image.tostring
+    return to_bytes(surf, "RGBA")
+
+def surface_flags(surf):
+    return FLAG_ALPHA if surf.get_flags() & pygame.SRCALPHA else 0
+
+def surface_from_bytes(pixels, w, h, flags):
+    surf = pygame.image.frombuffer(pixels, (w, h), "RGBA")
+    return surf.convert_alpha() if flags & FLAG_ALPHA else surf.convert()
+
+def render_seeded(func, args, kwargs, seed):
+    # Seeds a thread-private RNG: the global stream (the session's) is
+    # left alone, and concurrent renders cannot draw from each other's.
+    with assets.seeded_random(seed):
+        return func(*args, **kwargs)
+
+class AssetCache:
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, version=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version if version is not None else source_version()
+        self.hits = 0
+        self.misses = 0
+        self.preloaded = {}
+        self.enabled = bool(directory) and directory != "0"
+        if self.enabled:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                self.enabled = False
+
+    def key(self, func, args, kwargs, seed):
+        h = hashlib.sha1(self.version)
+        scale = assets.current_render_scale()
+        h.update(repr((func.__name__, args, sorted(kwargs.items()), seed, scale)).encode("utf-8"))
+        return h.hexdigest()
+
+    def stats(self):
+        return f"{self.hits}h/{self.misses}m"
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def contains(self, func, args, kwargs, seed):
+        key = self.key(func, args, kwargs, seed)
+        return key in self.preloaded or (self.enabled and os.path.exists(self.path_for(key)))
+
+    def preload(self, func, args, kwargs, seed, pixels, w, h, flags):
+        # Pixels rendered somewhere else (a worker process); the next load()
+        # of the same asset takes the surface instead of rendering it.
+        key = self.key(func, args, kwargs, seed)
+        surf = self.preloaded[key] = REGISTRY.record(surface_from_bytes(pixels, w, h, flags), func.__name__)
+        REGISTRY.evictable(surf, self.preloaded, key)
+        if self.enabled:
+            self._write_pixels(self.path_for(key), pixels, w, h, flags)
+
+    def load(self, func, *args, seed=0, **kwargs):
+        key = self.key(func, args, kwargs, seed)
+        surf = self.preloaded.pop(key, None)
+        if surf is not None:
+            self.hits += 1
+            return surf
+
+        if not self.enabled:
+            return render_seeded(func, args, kwargs, seed)
+
+        path = self.path_for(key)
+        surf = self._read(path)
+        if surf is not None:
+            self.hits += 1
+            return REGISTRY.record(surf, func.__name__)
+
+        self.misses += 1
+        surf = render_seeded(func, args, kwargs, seed)
+        self._write(path, surf)
+        return surf
+
+    def _read(self, path):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if len(data) < HEADER.size:
+            self._discard(path)
+            return None
+        magic, version, w, h, flags = HEADER.unpack_from(data)
+        if magic != MAGIC or version != self.version or len(data) != HEADER.size + w * h * 4:
+            self._discard(path)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return surface_from_bytes(memoryview(data)[HEADER.size:], w, h, flags)
+
+    def _write(self, path, surf):
+        self._write_pixels(path, surface_to_bytes(surf), *surf.get_size(), surface_flags(surf))
+
+    def _write_pixels(self, path, pixels, w, h, flags):
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(HEADER.pack(MAGIC, self.version, w, h, flags))
+                f.write(pixels)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._discard(tmp_path)
+            return
+        self.evict()
+
+    def _discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def entries(self):
+        found = []
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return found
+        for name in names:
+            if not name.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self._discard(path)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._discard(path)
+
+ASSET_CACHE = AssetCache()
+
+def cached_asset(func, *args, seed=0, **kwargs):
+    return ASSET_CACHE.load(func, *args, seed=seed, **kwargs)
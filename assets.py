@@ -1,20 +1,105 @@
+import contextlib
 import math
+import sys
+import threading
 import cairo
+import numpy as np
 import pygame
 import random
 
-def cairo_surface_to_pygame(surf: cairo.ImageSurface) -> pygame.Surface:
+from profiler import timed_asset
+from registry import REGISTRY
+
+COIN_SIZE = 70
+
+_scale_state = threading.local()
+
+def current_render_scale():
+    return getattr(_scale_state, "scale", 1.0)
+
+@contextlib.contextmanager
+def render_scale(scale):
+    # Generators draw in logical units; the surfaces they create carry a
+    # device scale, so paths and text come out at the reduced resolution.
+    previous = current_render_scale()
+    _scale_state.scale = scale
+    try:
+        yield
+    finally:
+        _scale_state.scale = previous
+
+_rng_state = threading.local()
+
+def asset_random():
+    # The RNG of the seeded render running on this thread; outside one,
+    # generators share the global stream as before.
+    return getattr(_rng_state, "rng", None) or random
+
+@contextlib.contextmanager
+def seeded_random(seed):
+    # Same stream as random.seed(seed), but private to this thread, so a
+    # prefetch-worker render and a main-thread one never interleave.
+    previous = getattr(_rng_state, "rng", None)
+    _rng_state.rng = random.Random(seed)
+    try:
+        yield
+    finally:
+        _rng_state.rng = previous
+
+def scaled_size(width, height, scale=None):
+    scale = current_render_scale() if scale is None else scale
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+def pixel_surface(pw, ph):
+    surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, pw, ph)
+    scale = current_render_scale()
+    if scale != 1.0:
+        surf.set_device_scale(scale, scale)
+    return surf
+
+def new_surface(width, height):
+    return pixel_surface(*scaled_size(width, height))
+
+# Cairo's ARGB32 is a native-endian 32-bit word, so the byte order in
+# memory depends on the host.
+CAIRO_BYTE_ORDER = "BGRA" if sys.byteorder == "little" else "ARGB"
+CAIRO_ALPHA_BYTE = CAIRO_BYTE_ORDER.index("A")
+
+def unpremultiply(pixels):
+    alpha = pixels[..., CAIRO_ALPHA_BYTE]
+    # alpha - 1 wraps 0 to 255, so this keeps only 1..254.
+    partial = np.nonzero(alpha - np.uint8(1) < 254)
+    if partial[0].size == 0:
+        return
+    px = pixels[partial].astype(np.uint32)
+    a = px[:, CAIRO_ALPHA_BYTE:CAIRO_ALPHA_BYTE + 1]
+    straight = np.minimum((px * 255 + a // 2) // a, 255)
+    straight[:, CAIRO_ALPHA_BYTE] = a[:, 0]
+    pixels[partial] = straight
+
+@timed_asset
+def cairo_surface_to_pygame(surf: cairo.ImageSurface, opaque=None) -> pygame.Surface:
+    # Converts in place: the cairo surface holds straight alpha afterwards,
+    # which saves a full-size copy before pygame's own convert.
+    # ARGB32 rows are always 4 * width bytes, so the buffer needs no pitch.
+    surf.flush()
+    w, h = surf.get_width(), surf.get_height()
     buf = surf.get_data()
-    return pygame.image.frombuffer(
-        buf, 
-        (surf.get_width(), surf.get_height()), 
-        'BGRA'
-    ).convert_alpha()
+    pixels = np.frombuffer(buf, np.uint8).reshape(h, w, 4)
+    if opaque is None:
+        opaque = bool((pixels[..., CAIRO_ALPHA_BYTE] == 255).all())
+    if not opaque:
+        unpremultiply(pixels)
+        surf.mark_dirty()
+    del pixels
+    image = pygame.image.frombuffer(buf, (w, h), CAIRO_BYTE_ORDER)
+    return REGISTRY.record(image.convert() if opaque else image.convert_alpha())
 
 def hex_to_rgb(hex_color):
     hex_color = hex_color.lstrip('#')
     return tuple(int(hex_color[i:i+2], 16)/255.0 for i in (0, 2, 4))
 
+@timed_asset
 def draw_button_base(ctx, x, y, width, height, chamfer_size):
     ctx.new_path()
     ctx.move_to(x + chamfer_size, y)
@@ -27,6 +112,63 @@ def draw_button_base(ctx, x, y, width, height, chamfer_size):
     ctx.line_to(x, y + chamfer_size)
     ctx.close_path()
 
+SPECKLE_DENSITY = 0.005
+SPECKLE_DARK = 0.3
+SPECKLE_LIGHT = 0.15
+# Below this many speckles the per-rectangle fills beat the layer's fixed
+# NumPy setup (HUD panel, pause icons).
+SPECKLE_LAYER_MIN = 64
+
+def box_coverage(start, length, taps):
+    # Coverage of the `taps` pixels from floor(start) by each span; index k
+    # is pixel floor(start) + k.
+    first = np.floor(start)
+    taps = first[:, None] + np.arange(taps, dtype=np.float32)
+    end = (start + length)[:, None]
+    cov = np.minimum(end, taps + 1) - np.maximum(start[:, None], taps)
+    return first.astype(np.int32), np.clip(cov, 0.0, 1.0)
+
+def speckle_layer(w, h):
+    # All speckles of a panel as one premultiplied layer. Coverage is summed
+    # per touched pixel only, then the light speckles are put over the dark
+    # ones, as the two separate fills used to.
+    count = int(w * h * SPECKLE_DENSITY)
+    scale = current_render_scale()
+    pw, ph = scaled_size(w, h)
+    surf = pixel_surface(pw, ph)
+    if not count:
+        return surf
+    rng = np.random.default_rng(asset_random().getrandbits(64))
+    xs = rng.integers(0, int(w), count, endpoint=True).astype(np.float32) * scale
+    ys = rng.integers(0, int(h), count, endpoint=True).astype(np.float32) * scale
+    sizes = rng.uniform(1, 2, count).astype(np.float32) * scale
+    dark = rng.random(count) > 0.5
+
+    # Speckles are 1-2 units wide. At full scale they start on a pixel
+    # edge and touch two pixels per axis; scaled, they can straddle three.
+    taps = 2 if scale == 1.0 else math.ceil(2 * scale) + 1
+    x0, cov_x = box_coverage(xs, sizes, taps)
+    y0, cov_y = box_coverage(ys, sizes, taps)
+    px = x0[:, None, None] + np.arange(taps, dtype=np.int32)
+    py = y0[:, None, None] + np.arange(taps, dtype=np.int32)[:, None]
+    cov = cov_y[:, :, None] * cov_x[:, None, :]
+    keep = (cov > 0) & (px < pw) & (py < ph)
+    stride = surf.get_stride() // 4
+    pixel, slot = np.unique((py * stride + px)[keep], return_inverse=True)
+    weight = cov[keep]
+    is_dark = np.broadcast_to(dark[:, None, None], cov.shape)[keep]
+
+    # Overlaps within one colour were a union of rectangles, not a stack.
+    dark_a = np.minimum(np.bincount(slot, weight * is_dark, pixel.size), 1.0) * SPECKLE_DARK
+    light_a = np.minimum(np.bincount(slot, weight * ~is_dark, pixel.size), 1.0) * SPECKLE_LIGHT
+    alpha = ((light_a + dark_a * (1.0 - light_a)) * 255 + 0.5).astype(np.uint32)
+    white = (light_a * 255 + 0.5).astype(np.uint32)
+    pixels = np.frombuffer(surf.get_data(), np.uint32)
+    pixels[pixel] = (alpha << 24) | (white << 16) | (white << 8) | white
+    surf.mark_dirty()
+    return surf
+
+@timed_asset
 def draw_stone_texture(ctx, w, h, dark_mode=False):
     if dark_mode:
         ctx.set_source_rgb(0.15, 0.15, 0.18)
@@ -35,40 +177,43 @@ def draw_stone_texture(ctx, w, h, dark_mode=False):
     ctx.rectangle(0, 0, w, h)
     ctx.fill()
     
-    for _ in range(int(w * h * 0.005)):
-        nx = random.randint(0, int(w))
-        ny = random.randint(0, int(h))
-        size = random.uniform(1, 2)
-        if random.random() > 0.5:
-            ctx.set_source_rgba(0, 0, 0, 0.3)
-        else:
-            ctx.set_source_rgba(1, 1, 1, 0.15)
-        ctx.rectangle(nx, ny, size, size)
-        ctx.fill()
+    rng = asset_random()
+    count = int(w * h * SPECKLE_DENSITY)
+    if count >= SPECKLE_LAYER_MIN:
+        ctx.set_source_surface(speckle_layer(w, h), 0, 0)
+        ctx.paint()
+    else:
+        for _ in range(count):
+            nx = rng.randint(0, int(w))
+            ny = rng.randint(0, int(h))
+            size = rng.uniform(1, 2)
+            if rng.random() > 0.5:
+                ctx.set_source_rgba(0, 0, 0, SPECKLE_DARK)
+            else:
+                ctx.set_source_rgba(1, 1, 1, SPECKLE_LIGHT)
+            ctx.rectangle(nx, ny, size, size)
+            ctx.fill()
 
     ctx.set_line_width(1)
     ctx.set_source_rgba(0.05, 0.05, 0.08, 0.4)
     for _ in range(int((w+h)/100) + 1):
-        cx = random.randint(0, int(w))
-        cy = random.randint(0, int(h))
+        cx = rng.randint(0, int(w))
+        cy = rng.randint(0, int(h))
         ctx.move_to(cx, cy)
-        for _ in range(random.randint(3, 6)):
-            cx += random.randint(-15, 15)
-            cy += random.randint(-15, 15)
+        for _ in range(rng.randint(3, 6)):
+            cx += rng.randint(-15, 15)
+            cy += rng.randint(-15, 15)
             ctx.line_to(cx, cy)
         ctx.stroke()
         
     for _ in range(3):
-        mx = random.randint(0, int(w))
-        my = random.randint(0, int(h))
+        mx = rng.randint(0, int(w))
+        my = rng.randint(0, int(h))
         ctx.set_source_rgba(0.2, 0.3, 0.15, 0.15)
-        ctx.arc(mx, my, random.randint(10, 30), 0, 2*math.pi)
+        ctx.arc(mx, my, rng.randint(10, 30), 0, 2*math.pi)
         ctx.fill()
 
-def draw_hud_panel(width, height):
-    surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
-    ctx = cairo.Context(surf)
-    
+def paint_hud_panel(ctx, width, height):
     ctx.new_path()
     roughness = 2
     ctx.move_to(0, roughness)
@@ -85,13 +230,14 @@ def draw_hud_panel(width, height):
     ctx.set_source_rgba(0.6, 0.6, 0.65, 0.8)
     ctx.set_line_width(2)
     ctx.stroke()
-    
+
+@timed_asset
+def draw_hud_panel(width, height):
+    surf = new_surface(width, height)
+    paint_hud_panel(cairo.Context(surf), width, height)
     return cairo_surface_to_pygame(surf)
 
-def draw_heart_icon(size):
-    surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
-    ctx = cairo.Context(surf)
-    
+def paint_heart_icon(ctx, size):
     cx, cy = size/2, size/2 + size*0.1
     r = size * 0.45
     
@@ -110,12 +256,14 @@ def draw_heart_icon(size):
     ctx.set_source_rgba(0.9, 0.8, 0.8, 0.5)
     ctx.set_line_width(1)
     ctx.stroke()
-    
+
+@timed_asset
+def draw_heart_icon(size):
+    surf = new_surface(size, size)
+    paint_heart_icon(cairo.Context(surf), size)
     return cairo_surface_to_pygame(surf)
 
-def draw_pause_icon(size, hover=False):
-    surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
-    ctx = cairo.Context(surf)
+def paint_pause_icon(ctx, size, hover=False):
     cx, cy = size/2, size/2
     r = size/2 - 2
     ctx.arc(cx, cy, r, 0, 2*math.pi)
@@ -150,11 +298,16 @@ def draw_pause_icon(size, hover=False):
     ctx.stroke()
     ctx.rectangle(cx + bar_w*0.8, cy - bar_h/2, bar_w, bar_h)
     ctx.stroke()
-    
+
+@timed_asset
+def draw_pause_icon(size, hover=False):
+    surf = new_surface(size, size)
+    paint_pause_icon(cairo.Context(surf), size, hover)
     return cairo_surface_to_pygame(surf)
 
+@timed_asset
 def draw_popup_menu(width, height, title_text="PAUSED"):
-    surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, int(width), int(height))
+    surf = new_surface(int(width), int(height))
     ctx = cairo.Context(surf)    
     m = 0 
     color_light = hex_to_rgb("#beaa9d") 
@@ -191,9 +344,7 @@ def draw_popup_menu(width, height, title_text="PAUSED"):
 
     return cairo_surface_to_pygame(surf)
 
-def draw_colored_button(width, height, text, color_hex, hover=False):
-    surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, int(width), int(height + 10))
-    ctx = cairo.Context(surf)
+def paint_colored_button(ctx, width, height, text, color_hex, hover=False):
     r, g, b = hex_to_rgb(color_hex)
     
     if hover:
@@ -238,204 +389,316 @@ def draw_colored_button(width, height, text, color_hex, hover=False):
     ctx.set_source_rgb(1, 1, 1)
     ctx.show_text(text)
 
+@timed_asset
+def draw_colored_button(width, height, text, color_hex, hover=False):
+    surf = new_surface(int(width), int(height + 10))
+    paint_colored_button(cairo.Context(surf), width, height, text, color_hex, hover)
     return cairo_surface_to_pygame(surf)
 
-def draw_background_game(width, height):
-    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, int(width), int(height))
-    ctx = cairo.Context(surface)
-
-    GROUND_DARK = (0.15, 0.12, 0.10)
-    GROUND_MID = (0.25, 0.20, 0.15)
-    MOSS_DARK = (0.20, 0.35, 0.15)
-    MOSS_LIGHT = (0.35, 0.50, 0.25)
-    LIGHT_RAY = (1.0, 0.95, 0.8, 0.08)
-
-    ctx.set_source_rgb(*GROUND_DARK)
-    ctx.paint()
-
-    for _ in range(150):
-        x = random.randint(0, int(width))
-        y = random.randint(0, int(height))
-        rad = random.randint(20, 100)
-        ctx.set_source_rgba(*GROUND_MID, 0.3)
-        ctx.arc(x, y, rad, 0, 2*math.pi)
-        ctx.fill()
+GROUND_DARK = (0.15, 0.12, 0.10)
+GROUND_MID = (0.25, 0.20, 0.15)
+MOSS_DARK = (0.20, 0.35, 0.15)
+MOSS_LIGHT = (0.35, 0.50, 0.25)
+LIGHT_RAY = (1.0, 0.95, 0.8, 0.08)
+SPARKLE = (1.0, 0.9, 0.6)
+STAMP_CHUNK = 1 << 20
+SMALL_STAMP_RADIUS = 8
+
+def stamp_circles(log_t, xs, ys, radii, alphas):
+    # Accumulates log transmittance of many same-coloured anti-aliased discs.
+    # Painting a colour over itself k times leaves prod(1 - a_i * cov_i) of
+    # what was underneath, so summing logs reproduces per-disc fills exactly.
+    h, w = log_t.shape
+    xs = np.asarray(xs, np.float32)
+    ys = np.asarray(ys, np.float32)
+    radii = np.asarray(radii, np.float32)
+    alphas = np.broadcast_to(np.asarray(alphas, np.float32), xs.shape)
+
+    big = radii > SMALL_STAMP_RADIUS
+    for x, y, r, a in zip(xs[big], ys[big], radii[big], alphas[big]):
+        x0, x1 = max(0, int(x - r) - 1), min(w, int(x + r) + 2)
+        y0, y1 = max(0, int(y - r) - 1), min(h, int(y + r) + 2)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        dx = np.arange(x0, x1, dtype=np.float32) + (0.5 - x)
+        dy = np.arange(y0, y1, dtype=np.float32)[:, None] + (0.5 - y)
+        cov = np.clip(r + 0.5 - np.sqrt(dx * dx + dy * dy), 0.0, 1.0)
+        log_t[y0:y1, x0:x1] += np.log1p(-a * cov)
+
+    small = ~big
+    if not small.any():
+        return
+    xs, ys, radii, alphas = xs[small], ys[small], radii[small], alphas[small]
+    reach = int(math.ceil(radii.max())) + 1
+    span = np.arange(-reach, reach + 1)
+    ox, oy = (a.ravel().astype(np.int32) for a in np.meshgrid(span, span))
+    chunk = max(1, STAMP_CHUNK // ox.size)
+    flat = log_t.reshape(-1)
+
+    for start in range(0, len(xs), chunk):
+        cx = xs[start:start + chunk, None]
+        cy = ys[start:start + chunk, None]
+        px = np.floor(cx).astype(np.int32) + ox
+        py = np.floor(cy).astype(np.int32) + oy
+        dist = np.hypot(px + 0.5 - cx, py + 0.5 - cy)
+        cov = np.clip(radii[start:start + chunk, None] + 0.5 - dist, 0.0, 1.0)
+        keep = (cov > 0) & (px >= 0) & (px < w) & (py >= 0) & (py < h)
+        contrib = np.log1p(-alphas[start:start + chunk, None] * cov)
+        flat += np.bincount((py * w + px)[keep], contrib[keep], minlength=flat.size)
+
+def layer_from_transmittance(log_t, rgb):
+    h, w = log_t.shape
+    alpha = np.exp(log_t)
+    np.subtract(1.0, alpha, out=alpha)
+    surf = pixel_surface(w, h)
+    pixels = np.frombuffer(surf.get_data(), np.uint32).reshape(h, surf.get_stride() // 4)[:, :w]
+    scaled = np.empty_like(alpha)
+    pixels[:] = 0
+    for shift, c in ((24, 1.0), (16, rgb[0]), (8, rgb[1]), (0, rgb[2])):
+        np.multiply(alpha, c * 255, out=scaled)
+        scaled += 0.5
+        pixels |= scaled.astype(np.uint32) << shift
+    surf.mark_dirty()
+    return surf
+
+BACKGROUND_LAYERS = ("ground", "moss", "rays", "vignette", "sparkles")
+MOSS_CLUMPS = 30
+MOSS_SPREAD = 40
+
+def background_params(width, height):
+    # Every layer draws the whole parameter set from the same seeded
+    # stream, so layers rendered (and cached) one by one still match.
+    rng = np.random.default_rng(asset_random().getrandbits(64))
+    ground = (rng.integers(0, width, 150, endpoint=True), rng.integers(0, height, 150, endpoint=True),
+              rng.integers(20, 100, 150, endpoint=True))
+
+    per_clump = MOSS_SPREAD * 2
+    mx = rng.integers(0, width, MOSS_CLUMPS, endpoint=True).repeat(per_clump)
+    my = rng.integers(0, height, MOSS_CLUMPS, endpoint=True).repeat(per_clump)
+    ox = mx + rng.uniform(-MOSS_SPREAD, MOSS_SPREAD, mx.size)
+    oy = my + rng.uniform(-MOSS_SPREAD, MOSS_SPREAD, mx.size)
+    size = rng.uniform(2, 6, mx.size)
+    light = rng.random(mx.size) > 0.7
+    moss_dark = (ox, oy, size)
+    moss_light = (ox[light] + 1, oy[light] - 1, size[light] * 0.6)
+
+    rays = list(zip(rng.integers(-200, width, 5, endpoint=True).tolist(),
+                    rng.integers(-100, height, 5, endpoint=True).tolist(),
+                    rng.integers(50, 150, 5, endpoint=True).tolist()))
+    sparkles = (rng.integers(0, width, 40, endpoint=True), rng.integers(0, height, 40, endpoint=True),
+                rng.uniform(0.5, 2, 40), rng.uniform(0.3, 0.7, 40))
+    return {"ground": ground, "moss": (moss_dark, moss_light), "rays": rays, "sparkles": sparkles}
+
+def render_background_layer(width, height, layer, params):
+    scale = current_render_scale()
+    pw, ph = scaled_size(width, height)
+    to_pixels = lambda *columns: [np.asarray(c, np.float32) * scale for c in columns]
+    log_t = np.zeros((ph, pw), np.float32)
+    surf = new_surface(width, height)
+    ctx = cairo.Context(surf)
 
-    def draw_moss(mx, my, size_base):
-        ctx.save()
-        ctx.translate(mx, my)
-        particles = int(size_base * 2)
-        for _ in range(particles):
-            ox = random.uniform(-size_base, size_base)
-            oy = random.uniform(-size_base, size_base)
-            size = random.uniform(2, 6)
-            ctx.set_source_rgba(*MOSS_DARK, 0.6)
-            ctx.arc(ox, oy, size, 0, 2*math.pi)
+    if layer == "ground":
+        ctx.set_source_rgb(*GROUND_DARK)
+        ctx.paint()
+        stamp_circles(log_t, *to_pixels(*params["ground"]), 0.3)
+        ctx.set_source_surface(layer_from_transmittance(log_t, GROUND_MID), 0, 0)
+        ctx.paint()
+    elif layer == "moss":
+        # Light highlights go on top of all dark particles instead of being
+        # interleaved with them; each clump looks the same.
+        for (xs, ys, radii), rgb, alpha in zip(params["moss"], (MOSS_DARK, MOSS_LIGHT), (0.6, 0.5)):
+            if len(xs):
+                log_t[:] = 0
+                stamp_circles(log_t, *to_pixels(xs, ys, radii), alpha)
+                ctx.set_source_surface(layer_from_transmittance(log_t, rgb), 0, 0)
+                ctx.paint()
+    elif layer == "rays":
+        ctx.rotate(math.radians(-15))
+        for lx, ly, w_ray in params["rays"]:
+            h_ray = height * 2
+            grad = cairo.LinearGradient(lx, 0, lx, h_ray)
+            grad.add_color_stop_rgba(0, *LIGHT_RAY)
+            grad.add_color_stop_rgba(1, 0, 0, 0, 0)
+            ctx.set_source(grad)
+            ctx.rectangle(lx, -100, w_ray, h_ray)
             ctx.fill()
-            if random.random() > 0.7:
-                ctx.set_source_rgba(*MOSS_LIGHT, 0.5)
-                ctx.arc(ox+1, oy-1, size*0.6, 0, 2*math.pi)
-                ctx.fill()
-        ctx.restore()
-
-    for _ in range(30):
-        draw_moss(random.randint(0, int(width)), random.randint(0, int(height)), 40)
-
+    elif layer == "vignette":
+        pat_vig = cairo.RadialGradient(width/2, height/2, width*0.3, width/2, height/2, width*0.8)
+        pat_vig.add_color_stop_rgba(0, 0, 0, 0, 0.0)
+        pat_vig.add_color_stop_rgba(1, 0.05, 0.02, 0.02, 0.85)
+        ctx.set_source(pat_vig)
+        ctx.paint()
+    elif layer == "sparkles":
+        xs, ys, radii, alphas = params["sparkles"]
+        stamp_circles(log_t, *to_pixels(xs, ys, radii), alphas)
+        ctx.set_source_surface(layer_from_transmittance(log_t, SPARKLE), 0, 0)
+        ctx.paint()
+    else:
+        raise ValueError(f"unknown background layer {layer}")
+    return surf
+
+@timed_asset
+def draw_background_layer(width, height, layer):
+    width, height = int(width), int(height)
+    surface = render_background_layer(width, height, layer, background_params(width, height))
+    return cairo_surface_to_pygame(surface, opaque=layer == "ground")
+
+@timed_asset
+def compose_background(layers):
+    # layers[0] is the opaque ground; the rest are blended over a copy.
+    surface = layers[0].copy()
+    surface.blits([(layer, (0, 0)) for layer in layers[1:]], doreturn=False)
+    return REGISTRY.record(surface)
+
+@timed_asset
+def draw_background_game(width, height):
+    rng = asset_random()
+    state = rng.getstate()
+    layers = []
+    for layer in BACKGROUND_LAYERS:
+        rng.setstate(state)
+        layers.append(draw_background_layer(width, height, layer))
+    return compose_background(layers)
+
+LEATHER_DARK = (0.28, 0.15, 0.08)
+LEATHER_BASE = (0.45, 0.25, 0.12)
+LEATHER_HIGH = (0.60, 0.35, 0.20)
+ROPE_COLOR_1 = (0.75, 0.65, 0.50)
+ROPE_COLOR_2 = (0.55, 0.45, 0.35)
+STITCH_COLOR = (0.85, 0.80, 0.70)
+# The shadow and the bulge of the body reach past the bin rect.
+SACK_PAD = 20
+
+def paint_sack_body(ctx, x, y, w, h):
+    cx = x + w / 2
+    base_y = y + h - 10
+    
     ctx.save()
-    ctx.rotate(math.radians(-15))
-    for _ in range(5):
-        lx = random.randint(-200, int(width))
-        ly = random.randint(-100, int(height))
-        w_ray = random.randint(50, 150)
-        h_ray = height * 2
-        grad = cairo.LinearGradient(lx, 0, lx, h_ray)
-        grad.add_color_stop_rgba(0, *LIGHT_RAY)
-        grad.add_color_stop_rgba(1, 0, 0, 0, 0)
-        ctx.set_source(grad)
-        ctx.rectangle(lx, -100, w_ray, h_ray)
-        ctx.fill()
+    ctx.scale(1, 0.3)
+    ctx.arc(cx, (base_y + 5) / 0.3, w * 0.45, 0, 2*math.pi)
+    ctx.set_source_rgba(0, 0, 0, 0.5)
+    ctx.fill()
     ctx.restore()
 
-    pat_vig = cairo.RadialGradient(width/2, height/2, width*0.3, width/2, height/2, width*0.8)
-    pat_vig.add_color_stop_rgba(0, 0, 0, 0, 0.0)
-    pat_vig.add_color_stop_rgba(1, 0.05, 0.02, 0.02, 0.85)
-    ctx.set_source(pat_vig)
-    ctx.paint()
+    neck_y = y + h * 0.25
+    neck_w = w * 0.55
+    
+    ctx.new_path()
+    ctx.move_to(cx - neck_w/2, neck_y)
+    ctx.curve_to(x - 10, y + h * 0.6, x + 10, base_y, cx, base_y)
+    ctx.curve_to(x + w - 10, base_y, x + w + 10, y + h * 0.6, cx + neck_w/2, neck_y)
+    ctx.close_path()
 
-    for _ in range(40):
-        px = random.randint(0, int(width))
-        py = random.randint(0, int(height))
-        ctx.set_source_rgba(1.0, 0.9, 0.6, random.uniform(0.3, 0.7))
-        ctx.arc(px, py, random.uniform(0.5, 2), 0, 2*math.pi)
-        ctx.fill()
+    grad = cairo.RadialGradient(cx - w*0.2, y + h*0.5, 10, cx, y + h*0.5, w*0.7)
+    grad.add_color_stop_rgb(0, *LEATHER_HIGH)
+    grad.add_color_stop_rgb(0.5, *LEATHER_BASE)
+    grad.add_color_stop_rgb(1, *LEATHER_DARK)
+    ctx.set_source(grad)
+    ctx.fill_preserve()
+    
+    ctx.set_source_rgba(0.2, 0.1, 0.05, 1)
+    ctx.set_line_width(2)
+    ctx.stroke()
 
-    surface.flush()
-    return cairo_surface_to_pygame(surface)
+    stitch_path_x = cx + w * 0.25
+    num_stitches = 8
+    for i in range(num_stitches):
+        prog = i / num_stitches
+        sy = (neck_y + 15) + prog * (h * 0.5)
+        sx = stitch_path_x + math.sin(prog * math.pi) * 10 
+        ctx.move_to(sx - 4, sy - 3)
+        ctx.line_to(sx + 4, sy + 3)
+        ctx.move_to(sx - 4, sy + 3)
+        ctx.line_to(sx + 4, sy - 3)
+        ctx.set_source_rgba(*STITCH_COLOR, 0.9)
+        ctx.set_line_width(1.5)
+        ctx.stroke()
 
-def draw_coin_sack(width, height, bin_rects, bin_labels):
-    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
-    ctx = cairo.Context(surface)
+    ctx.new_path()
+    ruffle_h = h * 0.15
+    top_y = y + 5
+    ctx.move_to(cx - neck_w/2 + 5, neck_y)
+    
+    x0, y0 = ctx.get_current_point()
+    qx1, qy1 = cx - neck_w/2 - 10, top_y + ruffle_h/2
+    qx2, qy2 = cx - neck_w/2, top_y
+    ctx.curve_to(x0 + (2/3)*(qx1 - x0), y0 + (2/3)*(qy1 - y0), qx2 + (2/3)*(qx1 - qx2), qy2 + (2/3)*(qy1 - qy2), qx2, qy2)
+    
+    ctx.curve_to(cx - neck_w/4, top_y + 10, cx + neck_w/4, top_y - 10, cx + neck_w/2, top_y)
+    
+    x0, y0 = ctx.get_current_point()
+    qx3, qy3 = cx + neck_w/2 + 10, top_y + ruffle_h/2
+    qx4, qy4 = cx + neck_w/2 - 5, neck_y
+    ctx.curve_to(x0 + (2/3)*(qx3 - x0), y0 + (2/3)*(qy3 - y0), qx4 + (2/3)*(qx3 - qx4), qy4 + (2/3)*(qy3 - qy4), qx4, qy4)
+    
+    ctx.close_path()
+    
+    grad_top = cairo.LinearGradient(cx, top_y, cx, neck_y)
+    grad_top.add_color_stop_rgb(0, *LEATHER_DARK)
+    grad_top.add_color_stop_rgb(1, *LEATHER_BASE)
+    ctx.set_source(grad_top)
+    ctx.fill()
 
-    LEATHER_DARK = (0.28, 0.15, 0.08)
-    LEATHER_BASE = (0.45, 0.25, 0.12)
-    LEATHER_HIGH = (0.60, 0.35, 0.20)
-    ROPE_COLOR_1 = (0.75, 0.65, 0.50)
-    ROPE_COLOR_2 = (0.55, 0.45, 0.35)
-    STITCH_COLOR = (0.85, 0.80, 0.70)
-
-    for rect, label in zip(bin_rects, bin_labels):
-        x, y, w, h = rect
-        cx = x + w / 2
-        base_y = y + h - 10
-        
+    rope_thick = 8
+    rope_segments = 12
+    rope_w = neck_w - 5
+    rope_start_x = cx - rope_w/2
+    for i in range(rope_segments):
+        seg_w = rope_w / rope_segments
+        sx = rope_start_x + i * seg_w
+        sy = neck_y - rope_thick/2
         ctx.save()
-        ctx.scale(1, 0.3)
-        ctx.arc(cx, (base_y + 5) / 0.3, w * 0.45, 0, 2*math.pi)
-        ctx.set_source_rgba(0, 0, 0, 0.5)
+        ctx.rectangle(sx, sy - 5, seg_w + 2, rope_thick + 10)
+        ctx.clip()
+        ctx.translate(sx + seg_w/2, sy + rope_thick/2)
+        ctx.rotate(math.radians(-20))
+        ctx.scale(0.8, 1.0)
+        ctx.arc(0, 0, rope_thick, 0, 2*math.pi)
+        if i % 2 == 0: ctx.set_source_rgb(*ROPE_COLOR_1)
+        else: ctx.set_source_rgb(*ROPE_COLOR_2)
         ctx.fill()
-        ctx.restore()
-
-        neck_y = y + h * 0.25
-        neck_w = w * 0.55
-        
-        ctx.new_path()
-        ctx.move_to(cx - neck_w/2, neck_y)
-        ctx.curve_to(x - 10, y + h * 0.6, x + 10, base_y, cx, base_y)
-        ctx.curve_to(x + w - 10, base_y, x + w + 10, y + h * 0.6, cx + neck_w/2, neck_y)
-        ctx.close_path()
-
-        grad = cairo.RadialGradient(cx - w*0.2, y + h*0.5, 10, cx, y + h*0.5, w*0.7)
-        grad.add_color_stop_rgb(0, *LEATHER_HIGH)
-        grad.add_color_stop_rgb(0.5, *LEATHER_BASE)
-        grad.add_color_stop_rgb(1, *LEATHER_DARK)
-        ctx.set_source(grad)
-        ctx.fill_preserve()
-        
-        ctx.set_source_rgba(0.2, 0.1, 0.05, 1)
-        ctx.set_line_width(2)
+        ctx.set_source_rgba(0.3, 0.2, 0.1, 0.8)
+        ctx.set_line_width(1)
         ctx.stroke()
+        ctx.restore()
 
-        stitch_path_x = cx + w * 0.25
-        num_stitches = 8
-        for i in range(num_stitches):
-            prog = i / num_stitches
-            sy = (neck_y + 15) + prog * (h * 0.5)
-            sx = stitch_path_x + math.sin(prog * math.pi) * 10 
-            ctx.move_to(sx - 4, sy - 3)
-            ctx.line_to(sx + 4, sy + 3)
-            ctx.move_to(sx - 4, sy + 3)
-            ctx.line_to(sx + 4, sy - 3)
-            ctx.set_source_rgba(*STITCH_COLOR, 0.9)
-            ctx.set_line_width(1.5)
-            ctx.stroke()
-
-        ctx.new_path()
-        ruffle_h = h * 0.15
-        top_y = y + 5
-        ctx.move_to(cx - neck_w/2 + 5, neck_y)
-        
-        x0, y0 = ctx.get_current_point()
-        qx1, qy1 = cx - neck_w/2 - 10, top_y + ruffle_h/2
-        qx2, qy2 = cx - neck_w/2, top_y
-        ctx.curve_to(x0 + (2/3)*(qx1 - x0), y0 + (2/3)*(qy1 - y0), qx2 + (2/3)*(qx1 - qx2), qy2 + (2/3)*(qy1 - qy2), qx2, qy2)
-        
-        ctx.curve_to(cx - neck_w/4, top_y + 10, cx + neck_w/4, top_y - 10, cx + neck_w/2, top_y)
-        
-        x0, y0 = ctx.get_current_point()
-        qx3, qy3 = cx + neck_w/2 + 10, top_y + ruffle_h/2
-        qx4, qy4 = cx + neck_w/2 - 5, neck_y
-        ctx.curve_to(x0 + (2/3)*(qx3 - x0), y0 + (2/3)*(qy3 - y0), qx4 + (2/3)*(qx3 - qx4), qy4 + (2/3)*(qy3 - qy4), qx4, qy4)
-        
-        ctx.close_path()
-        
-        grad_top = cairo.LinearGradient(cx, top_y, cx, neck_y)
-        grad_top.add_color_stop_rgb(0, *LEATHER_DARK)
-        grad_top.add_color_stop_rgb(1, *LEATHER_BASE)
-        ctx.set_source(grad_top)
-        ctx.fill()
-
-        rope_thick = 8
-        rope_segments = 12
-        rope_w = neck_w - 5
-        rope_start_x = cx - rope_w/2
-        for i in range(rope_segments):
-            seg_w = rope_w / rope_segments
-            sx = rope_start_x + i * seg_w
-            sy = neck_y - rope_thick/2
-            ctx.save()
-            ctx.rectangle(sx, sy - 5, seg_w + 2, rope_thick + 10)
-            ctx.clip()
-            ctx.translate(sx + seg_w/2, sy + rope_thick/2)
-            ctx.rotate(math.radians(-20))
-            ctx.scale(0.8, 1.0)
-            ctx.arc(0, 0, rope_thick, 0, 2*math.pi)
-            if i % 2 == 0: ctx.set_source_rgb(*ROPE_COLOR_1)
-            else: ctx.set_source_rgb(*ROPE_COLOR_2)
-            ctx.fill()
-            ctx.set_source_rgba(0.3, 0.2, 0.1, 0.8)
-            ctx.set_line_width(1)
-            ctx.stroke()
-            ctx.restore()
+def paint_sack_label(ctx, x, y, w, h, label):
+    cx = x + w / 2
+    base_y = y + h - 10
+    ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
+    ctx.set_font_size(min(w, h) * 0.25)
+    (xb, yb, wb, hb, xb_adv, yb_adv) = ctx.text_extents(label)
+    text_x = cx - wb / 2 - xb
+    text_y = base_y - h*0.20
+    ctx.set_source_rgba(0.2, 0.1, 0.05, 0.6)
+    ctx.move_to(text_x + 1, text_y + 2)
+    ctx.show_text(label)
+    ctx.set_source_rgba(0, 0, 0, 1)
+    ctx.move_to(text_x, text_y)
+    ctx.show_text(label)
 
-        ctx.select_font_face("Sans", cairo.FONT_SLANT_NORMAL, cairo.FONT_WEIGHT_BOLD)
-        ctx.set_font_size(min(w, h) * 0.25)
-        (xb, yb, wb, hb, xb_adv, yb_adv) = ctx.text_extents(label)
-        text_x = cx - wb / 2 - xb
-        text_y = base_y - h*0.20
-        ctx.set_source_rgba(0.2, 0.1, 0.05, 0.6)
-        ctx.move_to(text_x + 1, text_y + 2)
-        ctx.show_text(label)
-        ctx.set_source_rgba(0, 0, 0, 1)
-        ctx.move_to(text_x, text_y)
-        ctx.show_text(label)
+@timed_asset
+def draw_sack_body(w, h):
+    surface = new_surface(w + 2 * SACK_PAD, h + 2 * SACK_PAD)
+    paint_sack_body(cairo.Context(surface), SACK_PAD, SACK_PAD, w, h)
+    return cairo_surface_to_pygame(surface)
 
+@timed_asset
+def draw_sack_label(w, h, label):
+    surface = new_surface(w + 2 * SACK_PAD, h + 2 * SACK_PAD)
+    paint_sack_label(cairo.Context(surface), SACK_PAD, SACK_PAD, w, h, label)
     return cairo_surface_to_pygame(surface)
 
-def draw_falling_coin(value):
-    w, h = 70, 70
-    surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
-    ctx = cairo.Context(surf)
+@timed_asset
+def draw_coin_sack(width, height, bin_rects, bin_labels):
+    surface = new_surface(width, height)
+    ctx = cairo.Context(surface)
+    for (x, y, w, h), label in zip(bin_rects, bin_labels):
+        paint_sack_body(ctx, x, y, w, h)
+        paint_sack_label(ctx, x, y, w, h, label)
+    return cairo_surface_to_pygame(surface)
 
+def paint_falling_coin(ctx, value, w, h):
     cx, cy = w / 2, h / 2
     radius = (w / 2) - 5 
     pattern = cairo.RadialGradient(cx, cy, radius * 0.1, cx, cy, radius)
@@ -480,4 +743,60 @@ def draw_falling_coin(value):
     ctx.set_line_width(1.0)
     ctx.stroke()
 
-    return cairo_surface_to_pygame(surf)
\ No newline at end of file
+@timed_asset
+def draw_falling_coin(value):
+    w, h = COIN_SIZE, COIN_SIZE
+    surf = new_surface(w, h)
+    ctx = cairo.Context(surf)
+    paint_falling_coin(ctx, value, w, h)
+    return cairo_surface_to_pygame(surf)
+
+@timed_asset
+def draw_coin_atlas(max_value, columns):
+    rows = max_value // columns + 1
+    surf = new_surface(columns * COIN_SIZE, rows * COIN_SIZE)
+    ctx = cairo.Context(surf)
+    for value in range(max_value + 1):
+        row, col = divmod(value, columns)
+        ctx.save()
+        ctx.translate(col * COIN_SIZE, row * COIN_SIZE)
+        paint_falling_coin(ctx, value, COIN_SIZE, COIN_SIZE)
+        ctx.restore()
+    return cairo_surface_to_pygame(surf)
+
+UI_PAINTERS = {
+    "hud_panel": paint_hud_panel,
+    "heart": paint_heart_icon,
+    "pause": paint_pause_icon,
+    "button": paint_colored_button,
+}
+
+def ui_sprite_size(key):
+    kind = key[0]
+    if kind == "button":
+        return int(key[1]), int(key[2] + 10)
+    if kind == "hud_panel":
+        return key[1], key[2]
+    return key[1], key[1]
+
+def paint_ui_sprite(ctx, key):
+    UI_PAINTERS[key[0]](ctx, *key[1:])
+
+@timed_asset
+def draw_ui_sprite(key):
+    surf = new_surface(*ui_sprite_size(key))
+    paint_ui_sprite(cairo.Context(surf), key)
+    return cairo_surface_to_pygame(surf)
+
+@timed_asset
+def draw_ui_atlas(layout, width, height):
+    surf = new_surface(width, height)
+    ctx = cairo.Context(surf)
+    for x, y, key in layout:
+        ctx.save()
+        ctx.translate(x, y)
+        ctx.rectangle(0, 0, *ui_sprite_size(key))
+        ctx.clip()
+        paint_ui_sprite(ctx, key)
+        ctx.restore()
+    return cairo_surface_to_pygame(surf)
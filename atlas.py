@@ -0,0 +1,113 @@
+import pygame
+
+from assets import (
+    COIN_SIZE, draw_coin_atlas, draw_falling_coin, draw_ui_atlas, draw_ui_sprite, render_scale,
+    scaled_size, ui_sprite_size
+)
+from asset_cache import cached_asset
+from registry import REGISTRY
+
+MAX_COIN_VALUE = 100
+COIN_ATLAS_COLUMNS = 11
+UI_ATLAS_WIDTH = 1024
+UI_ATLAS_PADDING = 2
+
+class CoinAtlas:
+    def __init__(self, max_value=MAX_COIN_VALUE, columns=COIN_ATLAS_COLUMNS, eager=True, scale=1.0):
+        self.max_value = max_value
+        self.columns = columns
+        self.scale = scale
+        rows = max_value // columns + 1
+
+        if eager:
+            with render_scale(scale):
+                self.texture = cached_asset(draw_coin_atlas, max_value, columns)
+        else:
+            size = scaled_size(columns * COIN_SIZE, rows * COIN_SIZE, scale)
+            self.texture = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+            self.texture.fill((0, 0, 0, 0))
+        self.filled = [eager] * (max_value + 1)
+
+        # Cells are placed on the scaled grid, so at fractional scales a
+        # face can lose its last half pixel of (transparent) margin.
+        cell = int(COIN_SIZE * scale)
+        self.rects = []
+        for value in range(max_value + 1):
+            row, col = divmod(value, columns)
+            self.rects.append(pygame.Rect(int(col * COIN_SIZE * scale), int(row * COIN_SIZE * scale), cell, cell))
+        self.faces = [self.texture.subsurface(r) for r in self.rects]
+
+    def fill(self, value):
+        rect = self.rects[value]
+        self.texture.fill((0, 0, 0, 0), rect)
+        with render_scale(self.scale):
+            face = draw_falling_coin(value)
+        self.texture.blit(face, rect, special_flags=pygame.BLEND_RGBA_ADD)
+        self.filled[value] = True
+
+    def face(self, value):
+        if not self.filled[value]:
+            self.fill(value)
+        return self.faces[value]
+
+_coin_atlases = {}
+
+def get_coin_atlas(scale=1.0):
+    atlas = _coin_atlases.get(scale)
+    if atlas is None:
+        atlas = _coin_atlases[scale] = CoinAtlas(scale=scale)
+        REGISTRY.evictable(atlas.texture, _coin_atlases, scale)
+    else:
+        REGISTRY.touch(atlas.texture)
+    return atlas
+
+def pack_sprites(keys, width=UI_ATLAS_WIDTH, padding=UI_ATLAS_PADDING):
+    # Shelf packing, tallest sprites first.
+    order = sorted(set(keys), key=lambda k: (-ui_sprite_size(k)[1], -ui_sprite_size(k)[0], repr(k)))
+    layout = []
+    x = y = shelf_h = 0
+    for key in order:
+        w, h = ui_sprite_size(key)
+        if x > 0 and x + w > width:
+            x, y, shelf_h = 0, y + shelf_h + padding, 0
+        layout.append((x, y, key))
+        x += w + padding
+        shelf_h = max(shelf_h, h)
+    return tuple(layout), (width, y + shelf_h)
+
+class UIAtlas:
+    def __init__(self, keys):
+        self.sprites = {}
+        self.texture = None
+        layout, size = pack_sprites(keys)
+        if layout:
+            self.texture = cached_asset(draw_ui_atlas, layout, *size)
+            for x, y, key in layout:
+                self.sprites[key] = self.texture.subsurface(pygame.Rect((x, y), ui_sprite_size(key)))
+
+    def sprite(self, key):
+        surf = self.sprites.get(key)
+        if surf is None:
+            # Sprites nobody declared up front still work, just unbatched.
+            surf = self.sprites[key] = cached_asset(draw_ui_sprite, key)
+        return surf
+
+    def button(self, width, height, text, color_hex, hover=False):
+        return self.sprite(("button", width, height, text, color_hex, hover))
+
+    def pause_icon(self, size, hover=False):
+        return self.sprite(("pause", size, hover))
+
+    def heart_icon(self, size):
+        return self.sprite(("heart", size))
+
+    def hud_panel(self, width, height):
+        return self.sprite(("hud_panel", width, height))
+
+_ui_atlas = None
+
+def get_ui_atlas(keys=()):
+    global _ui_atlas
+    if _ui_atlas is None:
+        _ui_atlas = UIAtlas(keys)
+    return _ui_atlas
@@ -0,0 +1,189 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+CASES = {
+    "draw_stone_texture": [(140, 40), (350, 400), (576, 768)],
+    "draw_background_game": [(288, 384), (576, 768)],
+    "draw_coin_sack": [(576, 120), (1152, 240)],
+    "draw_sack_body": [(128, 84), (32, 84)],
+    "draw_sack_label": [(128, 84), (32, 84)],
+    "draw_falling_coin": [(70, 70)],
+    "draw_colored_button": [(220, 60), (280, 60), (560, 120)],
+    "draw_popup_menu": [(350, 400), (400, 550)],
+    "cairo_surface_to_pygame": [(70, 70), (576, 768), (1152, 1536)],
+}
+
+def init_headless():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+
+def make_call(name, size):
+    import cairo
+    import assets
+
+    w, h = size
+    if name == "draw_stone_texture":
+        def call():
+            surf = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
+            assets.draw_stone_texture(cairo.Context(surf), w, h)
+        return call
+    if name == "draw_background_game":
+        return lambda: assets.draw_background_game(w, h)
+    if name == "draw_coin_sack":
+        bin_w = w // 4
+        bin_h = int(h * 0.7)
+        rects = [(i * bin_w + 8, (h - bin_h) // 2, bin_w - 16, bin_h) for i in range(4)]
+        labels = ["12 + 7", "9 x 8", "45 : 5", "3 + 5 x 2"]
+        return lambda: assets.draw_coin_sack(w, h, rects, labels)
+    if name == "draw_sack_body":
+        return lambda: assets.draw_sack_body(w, h)
+    if name == "draw_sack_label":
+        return lambda: assets.draw_sack_label(w, h, random.choice(["12 + 7", "9 x 8", "45 : 5", "3 + 5 x 2"]))
+    if name == "draw_falling_coin":
+        return lambda: assets.draw_falling_coin(random.randint(0, 100))
+    if name == "draw_colored_button":
+        return lambda: assets.draw_colored_button(w, h, "PENJUMLAHAN (+)", "#29b6f6", hover=random.random() > 0.5)
+    if name == "draw_popup_menu":
+        return lambda: assets.draw_popup_menu(w, h, "PILIH MODE")
+    if name == "cairo_surface_to_pygame":
+        source = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
+        ctx = cairo.Context(source)
+        ctx.set_source_rgba(0.8, 0.6, 0.1, 0.7)
+        ctx.paint()
+        return lambda: assets.cairo_surface_to_pygame(source)
+    raise ValueError(f"unknown generator {name}")
+
+def rendered_pixels(name, size):
+    # The sack generators paint a SACK_PAD margin around the bin for the
+    # shadow and the bulge, so the surface is bigger than the bin.
+    w, h = size
+    if name in ("draw_sack_body", "draw_sack_label"):
+        from assets import SACK_PAD
+        w, h = w + 2 * SACK_PAD, h + 2 * SACK_PAD
+    return w * h
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        return None
+
+def run_case(name, size, seeds, repeat):
+    init_headless()
+    import assets  # imported up front so its cost is not counted as peak
+    rss_start = current_rss_kb() if resource else None
+    # tracemalloc slows every allocation down, so it only runs when there
+    # is no RSS figure to use instead.
+    if rss_start is None:
+        tracemalloc.start()
+    call = make_call(name, size)
+    random.seed(0)
+    call()
+    times = []
+    for seed in range(seeds):
+        random.seed(seed)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start)
+    ms = statistics.median(times) * 1000
+    if rss_start is not None:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_start
+        peak_kind = "rss"
+    else:
+        peak_kb = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+        peak_kind = "python"
+    return f"{name}[{size[0]}x{size[1]}]", {
+        "ms_per_call": round(ms, 4),
+        "mpix_per_s": round(rendered_pixels(name, size) / 1e6 / (ms / 1000), 3),
+        "calls": len(times),
+        "peak_mb": round(max(0, peak_kb) / 1024, 2),
+        "peak_kind": peak_kind,
+    }
+
+def run_all(names, seeds, repeat):
+    # One fresh process per case: ru_maxrss never goes back down, so a
+    # process shared by several sizes would report the largest one's peak
+    # for all of them.
+    ctx = multiprocessing.get_context("spawn")
+    results = {}
+    with ctx.Pool(1, maxtasksperchild=1) as pool:
+        for name in names:
+            for size in CASES[name]:
+                key, entry = pool.apply(run_case, (name, size, seeds, repeat))
+                results[key] = entry
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for key, entry in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        ratio = entry["ms_per_call"] / base["ms_per_call"] if base["ms_per_call"] else 1.0
+        entry["vs_baseline"] = round(ratio, 3)
+        if ratio > 1 + threshold:
+            regressions.append((key, base["ms_per_call"], entry["ms_per_call"], ratio))
+    return regressions
+
+def print_table(results):
+    print(f"{'case':<42} {'ms/call':>9} {'MP/s':>9} {'peak MB':>8} {'vs base':>8}")
+    for key, e in results.items():
+        vs = f"{e['vs_baseline']:.2f}x" if "vs_baseline" in e else "-"
+        print(f"{key:<42} {e['ms_per_call']:>9.3f} {e['mpix_per_s']:>9.2f} {e['peak_mb']:>8.2f} {vs:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cairo asset generators headlessly.")
+    parser.add_argument("generators", nargs="*", help="subset to run (default: all of %s)" % ", ".join(CASES))
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5, help="calls per seed and size")
+    parser.add_argument("--save", metavar="JSON", help="write the results as a new baseline")
+    parser.add_argument("--baseline", metavar="JSON", help="compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="allowed slowdown before a case counts as a regression (0.15 = 15%%)")
+    args = parser.parse_args()
+
+    names = args.generators or list(CASES)
+    unknown = [n for n in names if n not in CASES]
+    if unknown:
+        parser.error(f"unknown generator(s): {', '.join(unknown)}")
+    results = run_all(names, args.seeds, args.repeat)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.threshold)
+
+    print_table(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"seeds": args.seeds, "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\nbaseline saved to {args.save}")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+        for key, old, new, ratio in regressions:
+            print(f"  {key}: {old:.3f} -> {new:.3f} ms ({ratio:.2f}x)")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import random
+import time
+
+from expressions import draw_problems, get_index
+
+OP_SETS = [
+    ("+", ['+']),
+    ("-", ['-']),
+    ("x", ['*']),
+    (":", ['/']),
+    ("all", ['+', '-', '*', '/']),
+]
+DIFFICULTIES = ["EASY", "MEDIUM", "HARD"]
+BIN_COUNT = 4
+
+# Copy of the eval-based rejection sampler that Game used before the index.
+def legacy_generate_expression(allowed_ops, is_complex):
+    while True:
+        ops = allowed_ops
+        nums = [random.randint(1, 12) for _ in range(3 if is_complex else 2)]
+        selected_ops = [random.choice(ops) for _ in range(2 if is_complex else 1)]
+
+        if not is_complex:
+            a, b = nums[0], nums[1]
+            op = selected_ops[0]
+
+            if op == '/':
+                a = b * random.randint(1, 10)
+
+            expr = f"{a} {op} {b}"
+
+        else:
+            expr = f"{nums[0]} {selected_ops[0]} {nums[1]}"
+            expr += f" {selected_ops[1]} {nums[2]}"
+
+        try:
+            ans = eval(expr)
+
+            if ans == int(ans) and 0 <= ans <= 100:
+                display_expr = expr.replace('*', 'x').replace('/', ':')
+
+                return display_expr, int(ans)
+        except ZeroDivisionError:
+            continue
+
+def legacy_draw_problems(allowed_ops, complex_flags):
+    problems = []
+    answers = []
+    while len(problems) < len(complex_flags):
+        expr, ans = legacy_generate_expression(allowed_ops, complex_flags[len(problems)])
+        if ans in answers:
+            continue
+        answers.append(ans)
+        problems.append((expr, ans))
+    return problems
+
+def complex_flags_for(difficulty):
+    if difficulty == "MEDIUM":
+        complex_indices = random.sample(range(BIN_COUNT), 2)
+    elif difficulty == "HARD":
+        complex_indices = list(range(BIN_COUNT))
+    else:
+        complex_indices = []
+    return [i in complex_indices for i in range(BIN_COUNT)]
+
+def rounds_per_second(draw, allowed_ops, difficulty, duration):
+    rounds = 0
+    start = time.perf_counter()
+    deadline = start + duration
+    while True:
+        for _ in range(50):
+            draw(allowed_ops, complex_flags_for(difficulty))
+        rounds += 50
+        now = time.perf_counter()
+        if now >= deadline:
+            return rounds / (now - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the eval-based and indexed problem generators.")
+    parser.add_argument("--duration", type=float, default=0.5, help="seconds to run each case")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    start = time.perf_counter()
+    for _, ops in OP_SETS:
+        get_index(ops, False)
+        get_index(ops, True)
+    print(f"index build (all operator sets): {(time.perf_counter() - start) * 1000:.1f} ms")
+    print()
+
+    print(f"{'ops':<5} {'level':<7} {'legacy/s':>12} {'indexed/s':>12} {'speedup':>9}")
+    for name, ops in OP_SETS:
+        for difficulty in DIFFICULTIES:
+            old = rounds_per_second(legacy_draw_problems, ops, difficulty, args.duration)
+            new = rounds_per_second(draw_problems, ops, difficulty, args.duration)
+            print(f"{name:<5} {difficulty:<7} {old:>12.0f} {new:>12.0f} {new / old:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import numpy as np
+import pygame
+
+PAUSE_SIGMA = 12.0
+PYRAMID_LEVELS = 2
+BLUR_IN_TIME = 0.25
+TINT_ALPHA = 100
+MIN_BOX_VARIANCE = 2 / 3
+
+def box_variance(radius):
+    return radius * (radius + 1) / 3
+
+def box_radii(variance):
+    # Stacked box passes whose variances add up to (at most) the requested
+    # Gaussian variance. Three boxes are close enough to a Gaussian; a
+    # small top-up during the blur-in gets a single box.
+    if variance < MIN_BOX_VARIANCE:
+        return []
+    passes = 3 if variance >= 3 * box_variance(2) else 1
+    width = int((12 * variance / passes + 1) ** 0.5)
+    lower = max(0, (width - 1) // 2)
+    radii = [lower] * passes
+    for i in range(passes):
+        if sum(box_variance(r) for r in radii) - box_variance(radii[i]) + box_variance(lower + 1) <= variance:
+            radii[i] = lower + 1
+    return [r for r in radii if r > 0]
+
+class BlurEngine:
+    def __init__(self, size, sigma=PAUSE_SIGMA, levels=PYRAMID_LEVELS, tint_alpha=TINT_ALPHA, duration=BLUR_IN_TIME):
+        self.size = size
+        self.tint_alpha = tint_alpha
+        self.duration = duration
+        self.output = pygame.Surface(size, 0, 32)
+        self.pyramid = []
+        w, h = size
+        for _ in range(levels):
+            w, h = max(1, w // 2), max(1, h // 2)
+            self.pyramid.append(pygame.Surface((w, h), 0, 32))
+        self.work = self.pyramid[-1] if self.pyramid else self.output
+        self.sigma = sigma * w / size[0]
+
+        self.buf = np.zeros((w, h, 3), np.float32)
+        self.shade = np.empty_like(self.buf)
+        self.scratch = {}
+        self.variance = 0.0
+        self.elapsed = 0.0
+        self.done = True
+
+    def capture(self, surface):
+        src = surface
+        for level in self.pyramid:
+            pygame.transform.smoothscale(src, level.get_size(), level)
+            src = level
+        if self.work is not src:
+            self.work.blit(surface, (0, 0))
+        view = pygame.surfarray.pixels3d(self.work)
+        self.buf[:] = view
+        del view
+        self.variance = 0.0
+        self.elapsed = 0.0
+        self.done = False
+
+    def advance(self, dt):
+        if self.done:
+            return self.output
+        self.elapsed = min(self.duration, self.elapsed + dt)
+        t = self.elapsed / self.duration if self.duration > 0 else 1.0
+        # Gaussian variances add, so each frame only blurs the current
+        # buffer by the difference to this frame's radius.
+        for radius in box_radii((self.sigma * t) ** 2 - self.variance):
+            self.box_pass(radius, 0)
+            self.box_pass(radius, 1)
+            self.variance += box_variance(radius)
+        self.present(t)
+        self.done = t >= 1.0
+        return self.output
+
+    def box_pass(self, radius, axis):
+        a = np.moveaxis(self.buf, axis, 0)
+        n = a.shape[0]
+        length = n + 2 * radius + 1
+        ext = self.scratch.get(axis)
+        if ext is None or ext.shape[0] < length:
+            ext = self.scratch[axis] = np.empty((length,) + a.shape[1:], np.float32)
+        ext = ext[:length]
+        ext[0] = 0
+        ext[1:radius + 1] = a[0]
+        ext[radius + 1:radius + 1 + n] = a
+        ext[radius + 1 + n:] = a[-1]
+        np.cumsum(ext, axis=0, out=ext)
+        np.subtract(ext[2 * radius + 1:], ext[:n], out=a)
+        a *= 1.0 / (2 * radius + 1)
+
+    def present(self, t):
+        np.multiply(self.buf, 1.0 - self.tint_alpha * t / 255, out=self.shade)
+        self.shade += 0.5
+        view = pygame.surfarray.pixels3d(self.work)
+        np.copyto(view, self.shade, casting="unsafe")
+        del view
+        if self.work is not self.output:
+            pygame.transform.smoothscale(self.work, self.size, self.output)
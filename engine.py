@@ -0,0 +1,225 @@
+import os
+import random
+
+from expressions import draw_problems, get_index
+
+WIDTH, HEIGHT = int(480*1.2), int(640*1.2)
+MIN_BINS, MAX_BINS = 2, 12
+BIN_COUNT = max(MIN_BINS, min(MAX_BINS, int(os.environ.get("ANGKA_BINS", "4"))))
+BOTTOM_H = 120
+BIN_H = 84
+COIN_SIZE = 70
+BASE_FALL_SPEED = 90
+SPEED_STEP = 30
+FAST_DROP_MULT = 4
+MOVE_SPEED = 300
+NEW_FALL_INTERVAL = 1.2
+START_LIVES = 3
+SCORE_PER_LEVEL = 5
+SPEED_MESSAGE_TIME = 2.0
+SIM_HZ = 120
+FIXED_DT = 1.0 / SIM_HZ
+MAX_FRAME_DT = 0.25
+
+def bin_limit(allowed_ops, difficulty, bin_count=BIN_COUNT):
+    # Every bin needs its own answer, and simple '/' only has ten. MEDIUM
+    # mixes simple and complex bins, so it is held to the smaller set:
+    # then whichever kind is drawn first, the other still has enough left.
+    kinds = {"HARD": (True,), "MEDIUM": (False, True)}.get(difficulty, (False,))
+    answer_count = min(len(get_index(allowed_ops, is_complex).answers) for is_complex in kinds)
+    return max(MIN_BINS, min(MAX_BINS, bin_count, answer_count))
+
+class Problem:
+    def __init__(self, expr, answer):
+        self.expr = expr
+        self.answer = answer
+
+class Coin:
+    def __init__(self, value, x, y, spawn_time=0.0):
+        self.value = value
+        self.x = x
+        self.y = y
+        self.w = COIN_SIZE
+        self.h = COIN_SIZE
+        self.spawn_time = spawn_time
+        self.fast_dropped = False
+        self.bin_index = None
+        self.prev_x = x
+        self.prev_y = y
+
+    def update(self, dt, move_dir, fall_speed, max_x):
+        self.prev_x, self.prev_y = self.x, self.y
+        self.x += move_dir * MOVE_SPEED * dt
+        self.x = max(0, min(max_x, self.x))
+        self.y += fall_speed * dt
+
+    def lerp(self, alpha):
+        return (self.prev_x + (self.x - self.prev_x) * alpha,
+                self.prev_y + (self.y - self.prev_y) * alpha)
+
+def segment_enters_rect(x0, y0, x1, y1, rect):
+    # Liang-Barsky clip: the earliest t in [0, 1] at which the segment is
+    # inside the rect (edges included), or None if it never is.
+    rx, ry, rw, rh = rect
+    dx, dy = x1 - x0, y1 - y0
+    t_in, t_out = 0.0, 1.0
+    for p, q in ((-dx, x0 - rx), (dx, rx + rw - x0), (-dy, y0 - ry), (dy, ry + rh - y0)):
+        if p == 0:
+            if q < 0:
+                return None
+            continue
+        t = q / p
+        if p < 0:
+            t_in = max(t_in, t)
+        else:
+            t_out = min(t_out, t)
+        if t_in > t_out:
+            return None
+    return t_in
+
+class Engine:
+    time_limit = None
+
+    def __init__(self, allowed_ops, difficulty, rng=None, clock=None,
+                 width=WIDTH, height=HEIGHT, bin_count=BIN_COUNT):
+        self.allowed_ops = allowed_ops
+        self.difficulty = difficulty
+        self.rng = rng if rng is not None else random.Random()
+        self.elapsed = 0.0
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.clock = clock if clock is not None else (lambda: self.elapsed)
+        self.width = width
+        self.height = height
+        self.bin_count = bin_limit(allowed_ops, difficulty, bin_count)
+        self.listeners = []
+
+        self.score = 0
+        self.lives = START_LIVES
+        self.speed_level = 1
+        self.fall_speed = BASE_FALL_SPEED
+        self.speed_message_timer = 0
+        self.time_since_last = 0
+        self.falling = None
+        self.bins = []
+        self.problems = []
+        self.next_problems = None
+        self.round = 0
+
+        self.make_problems_and_bins()
+
+    def emit(self, event, coin=None):
+        for listener in self.listeners:
+            listener(self, event, coin)
+
+    def complex_flags(self):
+        if self.difficulty == "MEDIUM":
+            complex_indices = self.rng.sample(range(self.bin_count), 2)
+        elif self.difficulty == "HARD":
+            complex_indices = range(self.bin_count)
+        else:
+            complex_indices = ()
+        return [i in complex_indices for i in range(self.bin_count)]
+
+    def draw_round(self):
+        drawn = draw_problems(self.allowed_ops, self.complex_flags(), self.rng)
+        return [Problem(expr, ans) for expr, ans in drawn]
+
+    def make_problems_and_bins(self):
+        bin_w = self.width // self.bin_count
+        bin_y = self.height - BOTTOM_H + (BOTTOM_H - BIN_H)//2
+
+        # The next round is always drawn one round ahead so front ends can
+        # prepare its visuals while the current round is being played.
+        if self.next_problems is None:
+            self.next_problems = self.draw_round()
+        self.problems = self.next_problems
+        self.next_problems = self.draw_round()
+        self.bins = [(i * bin_w + 8, bin_y, bin_w - 16, BIN_H) for i in range(self.bin_count)]
+        self.round += 1
+        self.emit("round")
+
+    def spawn_falling(self):
+        target = self.rng.choice(self.problems)
+        self.falling = Coin(target.answer, (self.width - 56)/2, -60, self.clock())
+        self.emit("spawn", self.falling)
+
+    def check_bin_collision(self):
+        coin = self.falling
+        if not coin: return
+        # Test the path the centre travelled this step, not just where it
+        # ended up, so a fast coin cannot skip over the bin band.
+        x0, y0 = coin.prev_x + coin.w/2, coin.prev_y + coin.h/2
+        x1, y1 = coin.x + coin.w/2, coin.y + coin.h/2
+        hit = None
+        for idx, r in enumerate(self.bins):
+            if max(y0, y1) < r[1] or min(y0, y1) > r[1] + r[3]:
+                continue
+            t = segment_enters_rect(x0, y0, x1, y1, r)
+            if t is not None and (hit is None or t < hit[0]):
+                hit = (t, idx)
+        if hit:
+            idx = hit[1]
+            coin.bin_index = idx
+            self.falling = None
+            if coin.value == self.problems[idx].answer:
+                self.score += 1
+                self.emit("correct", coin)
+            else:
+                self.lives -= 1
+                self.emit("wrong", coin)
+            self.make_problems_and_bins()
+            return
+        if coin.y > self.height:
+            coin.bin_index = -1
+            self.lives -= 1
+            self.falling = None
+            self.emit("missed", coin)
+
+    def step(self, dt, move_dir=0, fast_drop=False):
+        self.elapsed += dt
+        self.time_since_last += dt
+
+        if not self.falling and self.time_since_last >= NEW_FALL_INTERVAL:
+            self.spawn_falling()
+            self.time_since_last = 0
+
+        if self.falling:
+            speed_mult = FAST_DROP_MULT if fast_drop else 1
+            if fast_drop:
+                self.falling.fast_dropped = True
+            self.falling.update(dt, move_dir, self.fall_speed * speed_mult, self.width - self.falling.w)
+            self.check_bin_collision()
+
+        self.update_level(dt)
+
+    def update_level(self, dt):
+        if self.score > 0 and self.score % SCORE_PER_LEVEL == 0:
+            new_level = 1 + self.score // SCORE_PER_LEVEL
+            if new_level > self.speed_level:
+                self.speed_level = new_level
+                self.fall_speed = BASE_FALL_SPEED + (self.speed_level - 1) * SPEED_STEP
+                self.speed_message_timer = SPEED_MESSAGE_TIME
+                self.emit("level_up")
+
+        if self.speed_message_timer > 0:
+            self.speed_message_timer -= dt
+
+    def advance(self, frame_dt, move_dir=0, fast_drop=False):
+        # Runs whole fixed steps for the time that has passed and leaves the
+        # remainder for the next frame; alpha is how far the renderer should
+        # blend from the previous step to the current one.
+        self.accumulator += min(frame_dt, MAX_FRAME_DT)
+        while self.accumulator >= FIXED_DT and not self.is_game_over():
+            self.step(FIXED_DT, move_dir, fast_drop)
+            self.accumulator -= FIXED_DT
+        self.alpha = self.accumulator / FIXED_DT
+
+    def run(self, steps):
+        for dt, move_dir, fast_drop in steps:
+            if self.is_game_over():
+                break
+            self.step(dt, move_dir, fast_drop)
+
+    def is_game_over(self):
+        return self.lives <= 0
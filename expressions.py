@@ -0,0 +1,107 @@
+import random
+from fractions import Fraction
+from itertools import product
+
+MIN_OPERAND, MAX_OPERAND = 1, 12
+MAX_QUOTIENT = 10
+MIN_ANSWER, MAX_ANSWER = 0, 100
+
+# The old sampler drew the divisor/quotient pair (120 combinations) for '/'
+# and an operand pair (144 combinations) for the other operators, so each
+# simple '/' expression was 144/120 times as likely. 6:5 keeps that ratio.
+SIMPLE_WEIGHT = 5
+SIMPLE_DIV_WEIGHT = 6
+
+DISPLAY_OPS = {'+': '+', '-': '-', '*': 'x', '/': ':'}
+
+def apply_op(a, op, b):
+    if op == '+': return a + b
+    if op == '-': return a - b
+    if op == '*': return a * b
+    return Fraction(a) / b
+
+def evaluate(nums, ops):
+    if len(ops) == 1:
+        return apply_op(nums[0], ops[0], nums[1])
+    a, b, c = nums
+    op1, op2 = ops
+    if op1 in '+-' and op2 in '*/':
+        return apply_op(a, op1, apply_op(b, op2, c))
+    return apply_op(apply_op(a, op1, b), op2, c)
+
+def format_expr(nums, ops):
+    parts = [str(nums[0])]
+    for op, n in zip(ops, nums[1:]):
+        parts.append(DISPLAY_OPS[op])
+        parts.append(str(n))
+    return " ".join(parts)
+
+def is_valid_answer(ans):
+    return ans == int(ans) and MIN_ANSWER <= ans <= MAX_ANSWER
+
+class ExpressionIndex:
+    def __init__(self, allowed_ops, is_complex):
+        self.allowed_ops = tuple(allowed_ops)
+        self.is_complex = is_complex
+        self.by_answer = {}
+        self.pool = []
+
+        if is_complex:
+            self._index_complex()
+        else:
+            self._index_simple()
+
+        if not self.pool:
+            raise ValueError(f"no valid expressions for operators {self.allowed_ops}")
+        self.answers = sorted(self.by_answer)
+
+    def _add(self, nums, ops, weight):
+        ans = evaluate(nums, ops)
+        if not is_valid_answer(ans):
+            return
+        entry = (format_expr(nums, ops), int(ans))
+        self.by_answer.setdefault(entry[1], []).append(entry[0])
+        self.pool.extend([entry] * weight)
+
+    def _index_simple(self):
+        operands = range(MIN_OPERAND, MAX_OPERAND + 1)
+        for op in self.allowed_ops:
+            if op == '/':
+                for b in operands:
+                    for q in range(1, MAX_QUOTIENT + 1):
+                        self._add((b * q, b), (op,), SIMPLE_DIV_WEIGHT)
+            else:
+                for a, b in product(operands, repeat=2):
+                    self._add((a, b), (op,), SIMPLE_WEIGHT)
+
+    def _index_complex(self):
+        operands = range(MIN_OPERAND, MAX_OPERAND + 1)
+        for ops in product(self.allowed_ops, repeat=2):
+            for nums in product(operands, repeat=3):
+                self._add(nums, ops, 1)
+
+    def draw(self, rng=random, exclude=()):
+        if len(exclude) >= len(self.answers) and all(ans in exclude for ans in self.answers):
+            raise ValueError("every answer of this expression set is already in use")
+        while True:
+            expr, ans = rng.choice(self.pool)
+            if ans not in exclude:
+                return expr, ans
+
+_indexes = {}
+
+def get_index(allowed_ops, is_complex):
+    key = (tuple(allowed_ops), bool(is_complex))
+    index = _indexes.get(key)
+    if index is None:
+        index = _indexes[key] = ExpressionIndex(allowed_ops, is_complex)
+    return index
+
+def draw_problems(allowed_ops, complex_flags, rng=random):
+    problems = []
+    answers = set()
+    for is_complex in complex_flags:
+        expr, ans = get_index(allowed_ops, is_complex).draw(rng, answers)
+        answers.add(ans)
+        problems.append((expr, ans))
+    return problems
@@ -1,425 +1,603 @@
+import os
 import pygame
 import random
 import math
+import time
+from fractions import Fraction
+
+import numpy as np
+
+from assets import BACKGROUND_LAYERS, compose_background, draw_background_layer, draw_popup_menu, draw_sack_body, draw_coin_atlas, draw_ui_atlas, render_scale, scaled_size
+from asset_cache import ASSET_CACHE, cached_asset
+from atlas import COIN_ATLAS_COLUMNS, MAX_COIN_VALUE, get_coin_atlas, get_ui_atlas, pack_sprites
+from blur import BlurEngine
+from engine import Engine, WIDTH, HEIGHT, BOTTOM_H, BIN_H, START_LIVES, bin_limit
+from fonts import get_font, render_text
+from prefetch import RoundPrefetcher, get_executor
+from preload import PRELOAD_COMPARE, preload_assets
+from profiler import PROFILER, TOGGLE_KEY as PROFILER_KEY
+from rain import RainEngine, RAIN_MODE
+from sacks import SackRow
+from replay import LiveInput
+from resolution import ResolutionScaler
+from registry import REGISTRY
+from sounds import SoundBank, pre_init as sound_pre_init
+from telemetry import TelemetryWriter
 
-from assets import (
-    draw_coin_sack, draw_falling_coin, draw_background_game, draw_hud_panel, draw_heart_icon, draw_pause_icon, 
-    draw_popup_menu, draw_colored_button 
-)
-
-WIDTH, HEIGHT = int(480*1.2), int(640*1.2)
 FPS = 60
-BIN_COUNT = 4
-BASE_FALL_SPEED = 90
-FALL_SPEED = BASE_FALL_SPEED
-MOVE_SPEED = 300
-NEW_FALL_INTERVAL = 1.2
+IDLE_TIMEOUT_MS = 500
+DIRTY_RECTS = os.environ.get("ANGKA_DIRTY_RECTS", "1") != "0"
+SCREEN_RECT = pygame.Rect(0, 0, WIDTH, HEIGHT)
+PROFILER_POS = (WIDTH - 250, 66)
+BACKGROUND_VARIANTS = 8
 
 TEXT_COLOR = (240, 230, 210) 
 TEXT_SHADOW = (20, 10, 5)
 
-pygame.init()
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
 clock = pygame.time.Clock()
-pygame.display.set_caption("Angka Anjlok")
-
-HUD_FONT = pygame.font.SysFont('Georgia', 20, bold=True)
-TITLE_FONT = pygame.font.SysFont('Georgia', 42, bold=True)
-SUBTITLE_FONT = pygame.font.SysFont('Georgia', 24, italic=True)
-
-class Problem:
-    def __init__(self, expr, answer):
-        self.expr = expr
-        self.answer = answer
-
-class FallingNumber:
-    def __init__(self, value, x, y):
-        self.value = value
-        self.x = x
-        self.y = y
-        self.image = draw_falling_coin(value)
-        self.w = self.image.get_width()
-        self.h = self.image.get_height()
-
-    # def update(self, dt, move_dir=0):
-    #     global FALL_SPEED
-    #     self.x += move_dir * MOVE_SPEED * dt
-    #     self.x = max(0, min(WIDTH - self.w, self.x))
-    #     self.y += FALL_SPEED * dt
-
-    def update(self, dt, move_dir=0, speed_multiplier=1):
-        global FALL_SPEED
-        self.x += move_dir * MOVE_SPEED * dt
-        self.x = max(0, min(WIDTH - self.w, self.x))        
-        self.y += (FALL_SPEED * speed_multiplier) * dt
-
-    def draw(self, surf):
-        surf.blit(self.image, (self.x, self.y))
+INPUT = LiveInput(clock)
+SCALER = ResolutionScaler(budget_ms=1000 / FPS)
+
+# Set up by init() rather than on import: the spawned preload workers
+# import this module too, and need no window, mixer, fonts or log.
+screen = None
+SOUNDS = None
+TELEMETRY = None
+HUD_FONT = TITLE_FONT = SUBTITLE_FONT = LABEL_FONT = HINT_FONT = BANNER_FONT = None
+
+def init():
+    global screen, SOUNDS, TELEMETRY, HUD_FONT, TITLE_FONT, SUBTITLE_FONT, LABEL_FONT, HINT_FONT, BANNER_FONT
+    if screen is not None:
+        return
+    sound_pre_init()
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Angka Anjlok")
+    SOUNDS = SoundBank()
+    TELEMETRY = TelemetryWriter()
+    PROFILER.counters["cache"] = ASSET_CACHE.stats
+
+    HUD_FONT = get_font('Georgia', 20, bold=True)
+    TITLE_FONT = get_font('Georgia', 42, bold=True)
+    SUBTITLE_FONT = get_font('Georgia', 24, italic=True)
+    LABEL_FONT = get_font('Georgia', 14, bold=True)
+    HINT_FONT = get_font('Georgia', 18)
+    BANNER_FONT = get_font('Georgia', 32, bold=True)
+
+def shutdown():
+    PROFILER.close()
+    if TELEMETRY is not None:
+        TELEMETRY.close()
+
+OPS_BUTTON_SIZE = (280, 60)
+OPS_BUTTONS = [
+    ("PENJUMLAHAN (+)", ['+'],             "#29b6f6"),
+    ("PENGURANGAN (-)", ['-'],             "#ef5350"),
+    ("PERKALIAN (x)",   ['*'],             "#ffa726"),
+    ("PEMBAGIAN (/)",   ['/'],             "#66bb6a"), 
+    ("SEMUA OPERASI",   ['+','-','*','/'], "#ab47bc")  
+]
+LEVEL_BUTTON_SIZE = (240, 60)
+LEVEL_BUTTONS = [
+    ("MUDAH",  "EASY",   "#81c784"),
+    ("SEDANG",  "MEDIUM", "#ffb74d"), 
+    ("SULIT",  "HARD",   "#e57373"),
+    ("HUJAN KOIN", RAIN_MODE, "#4fc3f7")
+]
+PAUSE_BUTTON_SIZE = (220, 60)
+PAUSE_BUTTONS = [
+    ("LANJUT", "resume",  "#8bc34a"),
+    ("ULANGI", "restart", "#ffcc00"),
+    ("KELUAR", "menu",    "#e53935")
+]
+OPS_SLAB = (400, 550, "PILIH MODE")
+LEVEL_SLAB = (350, 480, "PILIH LEVEL")
+PAUSE_SLAB = (350, 400, "PAUSE")
+PAUSE_ICON_SIZE = 48
+HEART_SIZE = 32
+SCORE_PANEL_SIZE = (140, 40)
+
+def ui_sprites():
+    keys = [("hud_panel",) + SCORE_PANEL_SIZE, ("heart", HEART_SIZE),
+            ("pause", PAUSE_ICON_SIZE, False), ("pause", PAUSE_ICON_SIZE, True)]
+    for (w, h), buttons in ((OPS_BUTTON_SIZE, OPS_BUTTONS), (LEVEL_BUTTON_SIZE, LEVEL_BUTTONS),
+                            (PAUSE_BUTTON_SIZE, PAUSE_BUTTONS)):
+        for label, _, color in buttons:
+            keys += [("button", w, h, label, color, False), ("button", w, h, label, color, True)]
+    return keys
+
+def ui_atlas():
+    return get_ui_atlas(ui_sprites())
 
 class Game:
-    def __init__(self, allowed_ops, difficulty):
-        global FALL_SPEED
-        FALL_SPEED = BASE_FALL_SPEED
-        self.allowed_ops = allowed_ops
-        self.difficulty = difficulty
-        self.score = 0
-        self.lives = 3
-        
-        self.background_img = draw_background_game(WIDTH, HEIGHT)
-        
-        self.score_panel = draw_hud_panel(140, 40)
-        self.heart_icon = draw_heart_icon(32)
-        
-        self.pause_btn_normal = draw_pause_icon(48, hover=False)
-        self.pause_btn_hover = draw_pause_icon(48, hover=True)
-        self.pause_rect = pygame.Rect(WIDTH - 60, 10, 48, 48)
-        
-        self.bins = []
-        self.problems = []
-        self.falling = None
-        self.time_since_last = 0
-        self.bin_surface = None
-        self.speed_level = 1
-        self.speed_message_timer = 0
-        
-        self.make_problems_and_bins()
-
-    def generate_expression(self, is_complex):
-        while True:
-            ops = self.allowed_ops
-            nums = [random.randint(1, 12) for _ in range(3 if is_complex else 2)]
-            selected_ops = [random.choice(ops) for _ in range(2 if is_complex else 1)]
-            
-            if not is_complex:
-                a, b = nums[0], nums[1]
-                op = selected_ops[0]
-                
-                if op == '/':
-                    a = b * random.randint(1, 10)
-                
-                expr = f"{a} {op} {b}"
-            
-            else:
-                expr = f"{nums[0]} {selected_ops[0]} {nums[1]}"
-                expr += f" {selected_ops[1]} {nums[2]}"
-
-            try:
-                ans = eval(expr)
-                
-                if ans == int(ans) and 0 <= ans <= 100:
-                    display_expr = expr.replace('*', 'x').replace('/', ':')
-                    
-                    return display_expr, int(ans)
-            except ZeroDivisionError:
-                continue
-
-    def make_problems_and_bins(self):
-        bottom_h = 120
-        bin_h = 84
-        bin_w = WIDTH // BIN_COUNT
-        bin_y = HEIGHT - bottom_h + (bottom_h - bin_h)//2
+    def __init__(self, allowed_ops, difficulty, rng=None, scale=1.0):
+        self.scale = scale
+        self.background_img = shared_background(scale)
+        self.world = world_surface(scale)
+        self.pending_scale = None
         
-        self.bins = []
-        self.problems = []
-        answers = []
-        complex_indices = []
+        ui = ui_atlas()
+        self.score_panel = ui.hud_panel(*SCORE_PANEL_SIZE)
+        self.heart_icon = ui.heart_icon(HEART_SIZE)
         
-        if self.difficulty == "MEDIUM":
-            complex_indices = random.sample(range(BIN_COUNT), 2)
-        elif self.difficulty == "HARD":
-            complex_indices = list(range(BIN_COUNT))
-
-        while len(self.problems) < BIN_COUNT:
-            current_idx = len(self.problems)
-            is_complex = current_idx in complex_indices            
-            expr, ans = self.generate_expression(is_complex)
-            
-            if ans in answers: 
-                continue
-                
-            answers.append(ans)
-            self.problems.append(Problem(expr, ans))
-
-        bin_labels = []
-        local_rects = []
-        
-        for i, p in enumerate(self.problems):
-            x = i * bin_w + 8
-            w = bin_w - 16
-            rect = (x, bin_y, w, bin_h)
-            self.bins.append(rect)
-            local_y = bin_y - (HEIGHT - bottom_h)
-            local_rects.append((x, local_y, w, bin_h))
-            bin_labels.append(p.expr)
-        
-        self.bin_surface = draw_coin_sack(WIDTH, bottom_h, local_rects, bin_labels)
-
-    def spawn_falling(self):
-        target = random.choice(self.problems)
-        fn = FallingNumber(value=target.answer, x=(WIDTH-56)/2, y=-60)
-        self.falling = fn
-
-    def check_bin_collision(self):
-        if not self.falling: return
-        cx = self.falling.x + self.falling.w/2
-        cy = self.falling.y + self.falling.h/2
-        for idx, r in enumerate(self.bins):
-            x, y, w, h = r
-            if x <= cx <= x+w and y <= cy <= y+h:
-                expected = self.problems[idx].answer
-                if self.falling.value == expected:
-                    self.score += 1
-                else:
-                    self.lives -= 1
-                self.falling = None
-                self.make_problems_and_bins()
-                return
-        if self.falling.y > HEIGHT:
-            self.lives -= 1
-            self.falling = None
+        self.pause_btn_normal = ui.pause_icon(PAUSE_ICON_SIZE, hover=False)
+        self.pause_btn_hover = ui.pause_icon(PAUSE_ICON_SIZE, hover=True)
+        self.pause_rect = pygame.Rect(WIDTH - 60, 10, PAUSE_ICON_SIZE, PAUSE_ICON_SIZE)
+        self.coin_atlas = get_coin_atlas(scale)
+        self.prefetcher = RoundPrefetcher(self.render_sack)
+        PROFILER.counters["prefetch"] = self.prefetcher.stats
+
+        self.sack_area = pygame.Rect(0, HEIGHT - BOTTOM_H, WIDTH, BOTTOM_H)
+        self.score_area = pygame.Rect(10, 10, 140, 40)
+        self.lives_area = pygame.Rect(170, 14, 35 * (START_LIVES - 1) + 32, 32)
+        banner = render_text(BANNER_FONT, "SPEED UP!", (0,0,0))
+        self.banner_area = banner.get_rect(center=(WIDTH//2, 100)).inflate(4, 4).move(1, 1)
+        self.start(allowed_ops, difficulty, rng)
+
+    def start(self, allowed_ops, difficulty, rng=None):
+        # Only the round state is rebuilt; every image above is kept.
+        self.rain = difficulty == RAIN_MODE
+        engine_cls = RainEngine if self.rain else Engine
+        self.engine = engine_cls(allowed_ops, difficulty, rng=rng)
+        self.engine.listeners.append(SOUNDS.on_engine_event)
+        if TELEMETRY.enabled:
+            self.engine.listeners.append(TELEMETRY.on_engine_event)
+        top = HEIGHT - BOTTOM_H
+        self.sack_rects = [(x, y - top, w, h) for x, y, w, h in self.engine.bins]
+        self.sacks = SackRow(WIDTH, BOTTOM_H, self.sack_rects, self.scale)
+        self.bin_surface = self.render_sack(self.prefetcher.labels_for(self.engine.problems))
+        self.sack_round = self.engine.round
+        self.score_text = None
+        self.score_text_value = None
+        self.last_dirty_state = None
+        self.prefetcher.schedule(self.engine.round + 1, self.engine.next_problems)
+
+    def restart(self, rng=None):
+        self.start(self.allowed_ops, self.difficulty, rng)
+
+    allowed_ops = property(lambda self: self.engine.allowed_ops)
+    difficulty = property(lambda self: self.engine.difficulty)
+    score = property(lambda self: self.engine.score)
+    lives = property(lambda self: self.engine.lives)
+    speed_level = property(lambda self: self.engine.speed_level)
+    falling = property(lambda self: self.engine.falling)
+
+    def render_sack(self, bin_labels):
+        return self.sacks.render(bin_labels)
+
+    def request_scale(self, scale):
+        # Asked for by a frame that is already over budget, so nothing is
+        # rendered here: the prefetch worker builds the new size's assets
+        # and poll_scale() swaps them in once they are ready.
+        if self.pending_scale is not None:
+            self.pending_scale[2].cancel()
+            self.pending_scale = None
+        if scale == self.scale:
+            return
+        labels = self.prefetcher.labels_for(self.engine.problems)
+        job = get_executor().submit(self.build_scale, scale, tuple(self.sack_rects), labels)
+        self.pending_scale = (scale, labels, job)
+
+    def build_scale(self, scale, sack_rects, labels):
+        sacks = SackRow(WIDTH, BOTTOM_H, sack_rects, scale)
+        return shared_background(scale), get_coin_atlas(scale), sacks, sacks.render(labels)
+
+    def poll_scale(self):
+        if self.pending_scale is None or not self.pending_scale[2].done():
+            return
+        scale, labels, job = self.pending_scale
+        self.pending_scale = None
+        try:
+            background, coin_atlas, sacks, bin_surface = job.result()
+        except Exception:
+            return  # stays at the current size; the scaler will ask again
+        self.set_scale(scale, background, coin_atlas, sacks, bin_surface, labels)
+
+    def set_scale(self, scale, background, coin_atlas, sacks, bin_surface, labels):
+        # The world layer (background, sack, coin) is drawn at this scale
+        # into an offscreen surface and stretched to the window; the HUD
+        # stays at full resolution.
+        self.scale = scale
+        self.background_img = background
+        self.coin_atlas = coin_atlas
+        self.world = world_surface(scale)
+        # A round (or a whole game) may have gone by while the worker ran.
+        if sacks.rects != self.sack_rects:
+            sacks = SackRow(WIDTH, BOTTOM_H, self.sack_rects, scale)
+        self.sacks = sacks
+        current = self.prefetcher.labels_for(self.engine.problems)
+        self.bin_surface = bin_surface if labels == current else self.render_sack(current)
+        self.prefetcher.schedule(self.engine.round + 1, self.engine.next_problems)
+        self.invalidate()
+
+    def swap_sack(self):
+        engine = self.engine
+        self.bin_surface = self.prefetcher.take(engine.round, engine.problems)
+        self.sack_round = engine.round
+        self.prefetcher.schedule(engine.round + 1, engine.next_problems)
 
     def update(self, dt, move_dir, is_fast_drop=False):
-        global FALL_SPEED
-        self.time_since_last += dt        
-        speed_mult = 4 if is_fast_drop else 1
-
-        if not self.falling and self.time_since_last >= NEW_FALL_INTERVAL:
-            self.spawn_falling()
-            self.time_since_last = 0
-            
-        if self.falling:
-            self.falling.update(dt, move_dir, speed_multiplier=speed_mult)
-            self.check_bin_collision()
-        
-        if self.score > 0 and self.score % 5 == 0:
-            new_level = 1 + self.score // 5
-            if new_level > self.speed_level:
-                self.speed_level = new_level
-                FALL_SPEED = BASE_FALL_SPEED + (self.speed_level - 1) * 30
-                self.speed_message_timer = 2.0
-
-        if self.speed_message_timer > 0:
-            self.speed_message_timer -= dt
+        self.poll_scale()
+        self.engine.advance(dt, move_dir, is_fast_drop)
+        if self.sack_round != self.engine.round:
+            self.swap_sack()
+
+    def dirty_state(self, mouse_pos):
+        coin = self.engine.falling
+        coin_key, coin_rect = None, None
+        if coin:
+            coin_key = coin.value
+            x, y = coin.lerp(self.engine.alpha)
+            coin_rect = pygame.Rect(int(x) - 1, int(y) - 1, coin.w + 2, coin.h + 2)
+        return (
+            (self.sack_round, self.sack_area),
+            (coin_key, coin_rect),
+            (self.score, self.score_area),
+            (self.lives, self.lives_area),
+            (self.pause_rect.collidepoint(mouse_pos), self.pause_rect),
+            (self.engine.speed_message_timer > 0, self.banner_area),
+        )
+
+    def invalidate(self):
+        self.last_dirty_state = None
 
     def draw(self, surf, mouse_pos):
+        self.draw_scene(surf, mouse_pos)
+        # Whatever the caller draws on top is unknown to the dirty tracker.
+        self.invalidate()
+
+    def draw_dirty(self, surf, mouse_pos, extra_rects=()):
+        state = self.dirty_state(mouse_pos)
+        prev, self.last_dirty_state = self.last_dirty_state, state
+        if prev is None or self.rain:
+            self.draw_scene(surf, mouse_pos)
+            return None
+
+        dirty = []
+        for (key, rect), (prev_key, prev_rect) in zip(state, prev):
+            if key == prev_key and rect == prev_rect:
+                continue
+            if prev_rect is not None:
+                dirty.append(prev_rect)
+            if rect is not None:
+                dirty.append(rect)
+        dirty.extend(extra_rects)
+
+        if self.world is not None:
+            dirty = [self.align_rect(rect) for rect in dirty]
+        dirty = merge_rects(dirty)
+        for rect in dirty:
+            self.draw_scene(surf, mouse_pos, rect)
+        return dirty
+
+    def align_rect(self, rect):
+        # Grows a window rect to the nearest edges that fall on whole world
+        # pixels (every 4 px at 0.75, every 2 px at 0.5), so the region can
+        # be scaled up on its own.
+        step = Fraction(self.scale).limit_denominator(16).denominator
+        left, top = rect.left // step * step, rect.top // step * step
+        right, bottom = -(-rect.right // step) * step, -(-rect.bottom // step) * step
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def draw_scene(self, surf, mouse_pos, rect=None):
+        # rect: the window area to redraw, aligned with align_rect() when
+        # the world is scaled; None redraws everything.
+        if self.world is None:
+            surf.set_clip(rect)
+            self.draw_world(surf, 1.0)
+        else:
+            area = surf.get_rect() if rect is None else rect.clip(surf.get_rect())
+            scale = self.scale
+            src = pygame.Rect(round(area.x * scale), round(area.y * scale), round(area.w * scale), round(area.h * scale))
+            self.world.set_clip(src)
+            self.draw_world(self.world, scale)
+            self.world.set_clip(None)
+            # Nearest-neighbour: a smooth scale of the whole window costs
+            # more than drawing it at full size.
+            pygame.transform.scale(self.world.subsurface(src), area.size, surf.subsurface(area))
+            surf.set_clip(rect)
+        self.draw_hud(surf, mouse_pos)
+        surf.set_clip(None)
+
+    def draw_world(self, surf, scale):
+        REGISTRY.touch(self.background_img)
+        REGISTRY.touch(self.coin_atlas.texture)
         surf.blit(self.background_img, (0, 0))
-        surf.blit(self.bin_surface, (0, HEIGHT - self.bin_surface.get_height()))
+        surf.blit(self.bin_surface, (0, surf.get_height() - self.bin_surface.get_height()))
         
-        if self.falling:
-            self.falling.draw(surf)
-
+        coin = self.engine.falling
+        if coin:
+            x, y = coin.lerp(self.engine.alpha)
+            surf.blit(self.coin_atlas.face(coin.value), (x * scale, y * scale))
+        if self.rain:
+            self.draw_rain(surf, scale)
+
+    def draw_rain(self, surf, scale):
+        coins = self.engine.coins
+        if not coins.count:
+            return
+        alpha = self.engine.alpha
+        px, py = coins.view(coins.prev_x), coins.view(coins.prev_y)
+        xs = ((px + (coins.view(coins.x) - px) * alpha) * scale).astype(np.int32)
+        ys = ((py + (coins.view(coins.y) - py) * alpha) * scale).astype(np.int32)
+        faces = map(self.coin_atlas.face, coins.view(coins.value).tolist())
+        surf.blits(zip(faces, zip(xs.tolist(), ys.tolist())), doreturn=False)
+
+    def draw_hud(self, surf, mouse_pos):
         panel_x, panel_y = 10, 10
         surf.blit(self.score_panel, (panel_x, panel_y))
         
-        diff_font = pygame.font.SysFont('Georgia', 14, bold=True)
-        diff_text = diff_font.render(self.difficulty, True, (200, 200, 200))
+        diff_text = render_text(LABEL_FONT, self.difficulty, (200, 200, 200))
         surf.blit(diff_text, (panel_x + 10, panel_y + 45))
 
-        score_text = HUD_FONT.render(f"Score: {self.score}", True, (255, 255, 255))
+        if self.score_text_value != self.score:
+            self.score_text = HUD_FONT.render(f"Score: {self.score}", True, (255, 255, 255))
+            self.score_text_value = self.score
+        score_text = self.score_text
         sx = panel_x + (140 - score_text.get_width()) // 2
         sy = panel_y + (40 - score_text.get_height()) // 2
         surf.blit(score_text, (sx, sy))
 
         start_x_lives = 170
-        for i in range(self.lives):
-            surf.blit(self.heart_icon, (start_x_lives + i * 35, 14))
+        if self.rain:
+            time_text = render_text(HUD_FONT, f"{math.ceil(self.engine.time_left)} s", (255, 255, 255))
+            surf.blit(time_text, (start_x_lives, 18))
+        else:
+            for i in range(self.lives):
+                surf.blit(self.heart_icon, (start_x_lives + i * 35, 14))
 
         is_hover = self.pause_rect.collidepoint(mouse_pos)
         btn_img = self.pause_btn_hover if is_hover else self.pause_btn_normal
         surf.blit(btn_img, self.pause_rect.topleft)
 
-        if self.speed_message_timer > 0:
-            msg_font = pygame.font.SysFont('Georgia', 32, bold=True)
-            msg_s = msg_font.render("SPEED UP!", True, (0,0,0))
-            msg = msg_font.render("SPEED UP!", True, (255, 220, 80))
+        if self.engine.speed_message_timer > 0:
+            msg_s = render_text(BANNER_FONT, "SPEED UP!", (0,0,0))
+            msg = render_text(BANNER_FONT, "SPEED UP!", (255, 220, 80))
             cx, cy = WIDTH//2, 100
             surf.blit(msg_s, msg_s.get_rect(center=(cx+2, cy+2)))
             surf.blit(msg, msg.get_rect(center=(cx, cy)))
 
     def is_game_over(self):
-        return self.lives <= 0
+        return self.engine.is_game_over()
+
+def world_surface(scale):
+    if scale == 1.0:
+        return None
+    return pygame.Surface(scaled_size(WIDTH, HEIGHT, scale)).convert()
+
+_background_seed = None
+_backgrounds = {}
+
+def background_seed():
+    global _background_seed
+    if _background_seed is None:
+        _background_seed = random.randrange(BACKGROUND_VARIANTS)
+    return _background_seed
+
+def shared_background(scale=1.0):
+    # One seeded background per process, reused by every screen and
+    # rendered once per resolution scale.
+    background = _backgrounds.get(scale)
+    if background is None:
+        # The layers are cached one by one; only the composite stays in memory.
+        with render_scale(scale):
+            layers = [cached_asset(draw_background_layer, WIDTH, HEIGHT, layer, seed=background_seed())
+                      for layer in BACKGROUND_LAYERS]
+        background = compose_background(layers)
+        _backgrounds[scale] = background
+        REGISTRY.evictable(background, _backgrounds, scale)
+    else:
+        REGISTRY.touch(background)
+    return background
+
+def startup_assets():
+    # Everything the menus and a first default game need, biggest first.
+    layout, size = pack_sprites(ui_sprites())
+    # The engine may clamp ANGKA_BINS per mode, so preload the sack width of
+    # every bin count a menu choice can end up with (usually just one).
+    bin_counts = sorted({bin_limit(ops, diff) for _, ops, _ in OPS_BUTTONS for _, diff, _ in LEVEL_BUTTONS})
+    return [
+        *[(draw_background_layer, (WIDTH, HEIGHT, layer), background_seed()) for layer in BACKGROUND_LAYERS],
+        (draw_coin_atlas, (MAX_COIN_VALUE, COIN_ATLAS_COLUMNS), 0),
+        (draw_ui_atlas, (layout,) + size, 0),
+        (draw_popup_menu, OPS_SLAB, 0),
+        (draw_popup_menu, LEVEL_SLAB, 0),
+        (draw_popup_menu, PAUSE_SLAB, 0),
+        *[(draw_sack_body, (WIDTH // count - 16, BIN_H), 0) for count in bin_counts],
+    ]
+
+def draw_loading(done, total):
+    pygame.event.pump()
+    screen.fill((30, 22, 16))
+    draw_text_centered(screen, "Memuat aset...", SUBTITLE_FONT, TEXT_COLOR, (WIDTH//2, HEIGHT//2 - 24))
+    bar = pygame.Rect(0, 0, 300, 14)
+    bar.center = (WIDTH//2, HEIGHT//2 + 20)
+    pygame.draw.rect(screen, (70, 52, 36), bar, border_radius=7)
+    pygame.draw.rect(screen, (255, 200, 80), (bar.x, bar.y, bar.w * done // total, bar.h), border_radius=7)
+    pygame.display.flip()
+
+def adapt_resolution(game, frame_start):
+    work_ms = (time.perf_counter() - frame_start) * 1000
+    if SCALER.record(work_ms):
+        game.request_scale(SCALER.scale)
+
+def merge_rects(rects):
+    merged = []
+    for rect in rects:
+        rect = rect.clip(SCREEN_RECT)
+        if not rect.w or not rect.h:
+            continue
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect = rect.union(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
 
 def draw_text_centered(surface, text, font, color, center_pos, shadow_offset=(2,2)):
-    shad = font.render(text, True, TEXT_SHADOW)
+    shad = render_text(font, text, TEXT_SHADOW)
     sr = shad.get_rect(center=(center_pos[0]+shadow_offset[0], center_pos[1]+shadow_offset[1]))
     surface.blit(shad, sr)
-    txt = font.render(text, True, color)
+    txt = render_text(font, text, color)
     tr = txt.get_rect(center=center_pos)
     surface.blit(txt, tr)
 
-def blur_surface(surface, scale_factor=0.1):
-    w, h = surface.get_size()
-    small_w = max(1, int(w * scale_factor))
-    small_h = max(1, int(h * scale_factor))
-    small_surf = pygame.transform.smoothscale(surface, (small_w, small_h))    
-    blurred_surf = pygame.transform.smoothscale(small_surf, (w, h))    
-    dark_tint = pygame.Surface((w, h), pygame.SRCALPHA)
-    dark_tint.fill((0, 0, 0, 100)) 
-    blurred_surf.blit(dark_tint, (0, 0))
-    
-    return blurred_surf
-
-def difficulty_menu():
-    levels = [
-        ("MUDAH",  "EASY",   "#81c784"),
-        ("SEDANG",  "MEDIUM", "#ffb74d"), 
-        ("SULIT",  "HARD",   "#e57373")
-    ]
-    
-    slab_w, slab_h = 350, 400
-    bg_slab = draw_popup_menu(slab_w, slab_h, "PILIH LEVEL")
-    bg_slab_rect = bg_slab.get_rect(center=(WIDTH//2, HEIGHT//2))
-    bg_world = draw_background_game(WIDTH, HEIGHT)
-    buttons = []
-    btn_w, btn_h = 240, 60
-    gap = 20
-    start_y = bg_slab_rect.top + 120
-    
-    for i, (label, diff_id, color) in enumerate(levels):
-        rect = pygame.Rect(0, 0, btn_w, btn_h)
-        rect.centerx = WIDTH // 2
-        rect.y = start_y + i * (btn_h + gap)
-        
-        img_normal = draw_colored_button(btn_w, btn_h, label, color, hover=False)
-        img_hover = draw_colored_button(btn_w, btn_h, label, color, hover=True)
-        
-        buttons.append({
-            "rect": rect,
-            "id": diff_id,
-            "img_normal": img_normal,
-            "img_hover": img_hover
-        })
-        
-    while True:
-        mouse_pos = pygame.mouse.get_pos()
-        screen.blit(bg_world, (0,0))
-        screen.blit(bg_slab, bg_slab_rect)
-        
-        for btn in buttons:
-            is_hover = btn["rect"].collidepoint(mouse_pos)
-            img = btn["img_hover"] if is_hover else btn["img_normal"]
-            screen.blit(img, btn["rect"])
-            
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return None
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for btn in buttons:
-                        if btn["rect"].collidepoint(mouse_pos):
-                            return btn["id"]
-                            
-        pygame.display.flip()
-        clock.tick(60)
-
-def main_menu():
-    ops_list = [
-        ("PENJUMLAHAN (+)", ['+'],             "#29b6f6"),
-        ("PENGURANGAN (-)", ['-'],             "#ef5350"),
-        ("PERKALIAN (x)",   ['*'],             "#ffa726"),
-        ("PEMBAGIAN (/)",   ['/'],             "#66bb6a"), 
-        ("SEMUA OPERASI",   ['+','-','*','/'], "#ab47bc")  
-    ]
-    
-    slab_w, slab_h = 400, 550 
-    menu_bg_img = draw_popup_menu(slab_w, slab_h, "PILIH MODE") 
-    menu_bg_rect = menu_bg_img.get_rect(center=(WIDTH//2, HEIGHT//2))    
-    bg_world_img = draw_background_game(WIDTH, HEIGHT)
-    buttons = []    
-    btn_width = 280
-    btn_height = 60
-    gap = 15
-    start_y_offset = 110 
-    
-    for i, (label, ops, color_hex) in enumerate(ops_list):
-        rect = pygame.Rect(0, 0, btn_width, btn_height)        
-        rect.centerx = WIDTH // 2
-        rect.y = menu_bg_rect.top + start_y_offset + i * (btn_height + gap)        
-        img_normal = draw_colored_button(btn_width, btn_height, label, color_hex, hover=False)
-        img_hover = draw_colored_button(btn_width, btn_height, label, color_hex, hover=True)
-        
-        buttons.append({
-            "rect": rect,
-            "ops": ops,
-            "img_normal": img_normal,
-            "img_hover": img_hover
-        })
-
-    while True:
-        mouse_pos = pygame.mouse.get_pos()
-        screen.blit(bg_world_img, (0,0))
-        screen.blit(menu_bg_img, menu_bg_rect)        
-
-        for btn in buttons:
-            rect = btn["rect"]
-            is_hover = rect.collidepoint(mouse_pos)            
-            image_to_draw = btn["img_hover"] if is_hover else btn["img_normal"]
-            screen.blit(image_to_draw, rect.topleft)
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                return None
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:
-                    for btn in buttons:
-                        if btn["rect"].collidepoint(mouse_pos):
-                            return btn["ops"]
-
-        pygame.display.flip()
-        clock.tick(60)
+def draw_buttons(surf, buttons, mouse_pos, shown, restore=None):
+    # `shown` remembers the hover state each button was last drawn with,
+    # so only buttons that changed are drawn again.
+    dirty = []
+    for i, btn in enumerate(buttons):
+        is_hover = btn["rect"].collidepoint(mouse_pos)
+        if shown.get(i) == is_hover:
+            continue
+        if is_hover and shown.get(i) is False:
+            SOUNDS.play("hover")
+        shown[i] = is_hover
+        if restore:
+            restore(btn["rect"])
+        surf.blit(btn["img_hover"] if is_hover else btn["img_normal"], btn["rect"])
+        dirty.append(btn["rect"])
+    return dirty
+
+class MenuScreen:
+    # Built once and reused on every visit to this menu.
+    def __init__(self, slab, entries, button_size, start_y_offset, gap):
+        self.slab_img = cached_asset(draw_popup_menu, *slab)
+        self.slab_rect = self.slab_img.get_rect(center=(WIDTH//2, HEIGHT//2))
+        self.backdrop = shared_background().copy()
+        self.backdrop.blit(self.slab_img, self.slab_rect)
+        btn_w, btn_h = button_size
+        ui = ui_atlas()
+        self.buttons = []
+        for i, (label, value, color) in enumerate(entries):
+            rect = pygame.Rect(0, 0, btn_w, btn_h)
+            rect.centerx = WIDTH // 2
+            rect.y = self.slab_rect.top + start_y_offset + i * (btn_h + gap)
+            self.buttons.append({
+                "rect": rect,
+                "value": value,
+                "img_normal": ui.button(btn_w, btn_h, label, color, hover=False),
+                "img_hover": ui.button(btn_w, btn_h, label, color, hover=True)
+            })
+
+    def restore(self, rect):
+        screen.blit(self.backdrop, rect, rect)
+
+    def run(self):
+        # The menu is static: it sleeps until there is input and then only
+        # redraws the buttons whose hover state changed.
+        shown = {}
+        full = True
+        while True:
+            mouse_pos = INPUT.mouse_pos()
+            if full:
+                screen.blit(self.backdrop, (0, 0))
+                shown.clear()
+            dirty = draw_buttons(screen, self.buttons, mouse_pos, shown, self.restore)
+            if full:
+                pygame.display.flip()
+                full = False
+            elif dirty:
+                pygame.display.update(dirty)
+
+            for event in INPUT.events():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    return None
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:
+                        for btn in self.buttons:
+                            if btn["rect"].collidepoint(mouse_pos):
+                                return btn["value"]
+                elif event.type == pygame.WINDOWEXPOSED:
+                    full = True
+
+            INPUT.tick(60)
+            if not full:
+                INPUT.wait(IDLE_TIMEOUT_MS)
 
 def main():
+    init()
+    # Everything random in a session hangs off the input source's seed, so
+    # a recorded session replays with the same rounds and the same assets.
+    random.seed(INPUT.seed)
+    game_rng = random.Random(INPUT.seed)
     state = "MENU_OPS"
     game = None
+    report = preload_assets(startup_assets(), draw_loading)
+    if report and PRELOAD_COMPARE:
+        print(report)
+    ops_menu = MenuScreen(OPS_SLAB, OPS_BUTTONS, OPS_BUTTON_SIZE, 110, 15)
+    level_menu = MenuScreen(LEVEL_SLAB, LEVEL_BUTTONS, LEVEL_BUTTON_SIZE, 120, 20)
     paused = False
-    cached_blur_bg = None 
+    pause_blur = BlurEngine((WIDTH, HEIGHT))
+    blur_captured = False
     selected_ops = [] 
     selected_diff = "EASY" 
-    slab_w, slab_h = 350, 400
-    pause_slab_img = draw_popup_menu(slab_w, slab_h, "PAUSE") 
+    pause_slab_img = cached_asset(draw_popup_menu, *PAUSE_SLAB)
     pause_slab_rect = pause_slab_img.get_rect(center=(WIDTH//2, HEIGHT//2))
-    pause_btn_w, pause_btn_h = 220, 60
+    pause_btn_w, pause_btn_h = PAUSE_BUTTON_SIZE
     pause_gap = 20
     slab_start_y = pause_slab_rect.top + 100 
-    pause_btn_data = [
-        {"text": "LANJUT",   "action": "resume",  "color": "#8bc34a"},
-        {"text": "ULANGI",   "action": "restart", "color": "#ffcc00"},
-        {"text": "KELUAR",   "action": "menu",    "color": "#e53935"}
-    ]
 
+    ui = ui_atlas()
     pause_buttons = []
-    for i, data in enumerate(pause_btn_data):
+    for i, (label, action, color) in enumerate(PAUSE_BUTTONS):
         rect = pygame.Rect(0, 0, pause_btn_w, pause_btn_h)
         rect.centerx = WIDTH // 2
         rect.y = slab_start_y + i * (pause_btn_h + pause_gap)
-        img_normal = draw_colored_button(pause_btn_w, pause_btn_h, data["text"], data["color"], hover=False)
-        img_hover = draw_colored_button(pause_btn_w, pause_btn_h, data["text"], data["color"], hover=True)
-        pause_buttons.append({"rect": rect, "action": data["action"], "img_normal": img_normal, "img_hover": img_hover})
-        
+        img_normal = ui.button(pause_btn_w, pause_btn_h, label, color, hover=False)
+        img_hover = ui.button(pause_btn_w, pause_btn_h, label, color, hover=True)
+        pause_buttons.append({"rect": rect, "action": action, "img_normal": img_normal, "img_hover": img_hover})
+    pause_hover = {}
+
+    def restore_pause(rect):
+        screen.blit(pause_blur.output, rect, rect)
+        screen.blit(pause_slab_img, rect, rect.move(-pause_slab_rect.x, -pause_slab_rect.y))
+
+    # Once a pause or game-over screen is fully on screen it stays put, and
+    # the loop sleeps on input instead of redrawing it every frame.
+    static_shown = False
+    idle = False
     while True:
-        dt = clock.tick(FPS) / 1000.0
-        mouse_pos = pygame.mouse.get_pos()
+        PROFILER.begin_frame()
+        if idle and state == "GAME":
+            INPUT.wait(IDLE_TIMEOUT_MS)
+        dt = INPUT.tick(FPS)
+        if idle:
+            # Time spent asleep on a static screen is not game time.
+            dt = min(dt, 1.0 / FPS)
+        idle = False
+        frame_start = time.perf_counter()
+        mouse_pos = INPUT.mouse_pos()
+        PROFILER.mark("wait")
 
         if state == "MENU_OPS":
-            ops = main_menu() 
+            PROFILER.cancel_frame()
+            ops = ops_menu.run()
             if ops is None: return
             selected_ops = ops
             state = "MENU_DIFF"
             continue
             
         elif state == "MENU_DIFF":
-            diff = difficulty_menu()
+            PROFILER.cancel_frame()
+            diff = level_menu.run()
             if diff is None: return
             selected_diff = diff
             
-            game = Game(selected_ops, selected_diff) 
+            if game is None:
+                game = Game(selected_ops, selected_diff, rng=random.Random(game_rng.getrandbits(63)), scale=SCALER.scale)
+            else:
+                game.start(selected_ops, selected_diff, rng=random.Random(game_rng.getrandbits(63)))
             paused = False
             state = "GAME"
             continue
 
-        for event in pygame.event.get():
+        for event in INPUT.events():
             if event.type == pygame.QUIT:
                 pygame.quit(); return
 
@@ -427,7 +605,7 @@ def main():
                 if not paused and not game.is_game_over():
                     if game.pause_rect.collidepoint(mouse_pos):
                         paused = True
-                        cached_blur_bg = None
+                        blur_captured = False
                 
                 elif paused:
                     for btn in pause_buttons:
@@ -435,53 +613,90 @@ def main():
                             act = btn["action"]
                             if act == "resume":
                                 paused = False
-                                cached_blur_bg = None
+                                blur_captured = False
                             elif act == "restart":
-                                game = Game(game.allowed_ops, game.difficulty) 
+                                game.restart(rng=random.Random(game_rng.getrandbits(63)))
                                 paused = False
-                                cached_blur_bg = None
+                                blur_captured = False
                             elif act == "menu":
                                 state = "MENU_OPS"
                                 paused = False
-                                cached_blur_bg = None
+                                blur_captured = False
 
                 elif game.is_game_over():
                      state = "MENU_OPS"
 
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT: game.move_dir = -1
+                if event.key == PROFILER_KEY:
+                    PROFILER.toggle()
+                    game.invalidate()
+                    static_shown = False
+                elif event.key == pygame.K_LEFT: game.move_dir = -1
                 elif event.key == pygame.K_RIGHT: game.move_dir = 1
                 elif event.key == pygame.K_r: state = "MENU_OPS"
                 elif event.key == pygame.K_ESCAPE:
                     if not game.is_game_over(): 
                         paused = not paused
-                        if not paused: cached_blur_bg = None
+                        if not paused: blur_captured = False
 
             elif event.type == pygame.KEYUP:
                 if event.key in [pygame.K_LEFT, pygame.K_RIGHT]:
                     game.move_dir = 0
 
+            elif event.type == pygame.WINDOWEXPOSED:
+                static_shown = False
+
         move_dir = 0
-        keys = pygame.key.get_pressed()
+        keys = INPUT.held()
         if keys[pygame.K_LEFT]: move_dir = -1
         if keys[pygame.K_RIGHT]: move_dir = 1        
         is_fast_drop = keys[pygame.K_DOWN]
+        PROFILER.mark("events")
         
         if not paused and not game.is_game_over():
             game.update(dt, move_dir, is_fast_drop)
+        # Renders on the prefetch worker may have gone over the asset budget.
+        REGISTRY.enforce_budget()
+        PROFILER.mark("update")
+
+        if DIRTY_RECTS and not paused and not game.is_game_over():
+            extra = (PROFILER.overlay_rect,) if PROFILER.enabled else ()
+            dirty = game.draw_dirty(screen, mouse_pos, extra)
+            if PROFILER.enabled:
+                PROFILER.draw_overlay(screen, PROFILER_POS)
+            PROFILER.mark("draw")
+            if dirty is None:
+                pygame.display.flip()
+            elif dirty:
+                pygame.display.update(dirty)
+            PROFILER.mark("present")
+            PROFILER.end_frame()
+            adapt_resolution(game, frame_start)
+            static_shown = False
+            continue
+
+        if static_shown and (paused or game.is_game_over()) and not PROFILER.enabled:
+            dirty = draw_buttons(screen, pause_buttons, mouse_pos, pause_hover, restore_pause) if paused else []
+            if dirty:
+                pygame.display.update(dirty)
+            PROFILER.end_frame()
+            idle = True
+            continue
 
-        game.draw(screen, mouse_pos)
+        if not (paused and blur_captured):
+            game.draw(screen, mouse_pos)
 
         if paused:
-            if cached_blur_bg is None:
-                screen_copy = screen.copy()
-                cached_blur_bg = blur_surface(screen_copy, scale_factor=0.1)
-            screen.blit(cached_blur_bg, (0, 0))
+            PROFILER.mark("draw")
+            if not blur_captured:
+                pause_blur.capture(screen)
+                blur_captured = True
+            blurred = pause_blur.advance(dt)
+            PROFILER.mark("blur")
+            screen.blit(blurred, (0, 0))
             screen.blit(pause_slab_img, pause_slab_rect)
-            for btn in pause_buttons:
-                is_hover = btn["rect"].collidepoint(mouse_pos)
-                image_to_draw = btn["img_hover"] if is_hover else btn["img_normal"]
-                screen.blit(image_to_draw, btn["rect"])
+            pause_hover.clear()
+            draw_buttons(screen, pause_buttons, mouse_pos, pause_hover)
 
         elif game.is_game_over():
             ov = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
@@ -489,9 +704,29 @@ def main():
             screen.blit(ov, (0, 0))
             draw_text_centered(screen, "PERMAINAN SELESAI", TITLE_FONT, (255, 80, 80), (WIDTH//2, HEIGHT//2 - 20))
             draw_text_centered(screen, f"Skor Akhir: {game.score}", SUBTITLE_FONT, (255, 255, 255), (WIDTH//2, HEIGHT//2 + 30))
-            draw_text_centered(screen, "Klik untuk kembali ke Menu", pygame.font.SysFont('Georgia', 18), (200, 200, 200), (WIDTH//2, HEIGHT//2 + 70))
+            draw_text_centered(screen, "Klik untuk kembali ke Menu", HINT_FONT, (200, 200, 200), (WIDTH//2, HEIGHT//2 + 70))
 
+        if PROFILER.enabled:
+            PROFILER.draw_overlay(screen, PROFILER_POS)
+        PROFILER.mark("draw")
         pygame.display.flip()
+        PROFILER.mark("present")
+        PROFILER.end_frame()
+        if paused:
+            static_shown = pause_blur.done
+        elif game.is_game_over():
+            static_shown = True
+        else:
+            static_shown = False
+            adapt_resolution(game, frame_start)
+
+def run(source):
+    global INPUT
+    INPUT = source
+    main()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    try:
+        main()
+    finally:
+        shutdown()
\ No newline at end of file
@@ -0,0 +1,58 @@
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="round-prefetch")
+    return _executor
+
+class RoundPrefetcher:
+    def __init__(self, render):
+        self.render = render
+        self.pending_round = None
+        self.pending = None
+        self.hits = 0
+        self.waits = 0
+        self.fallbacks = 0
+
+    def stats(self):
+        return f"{self.hits}h/{self.waits}w/{self.fallbacks}f"
+
+    def labels_for(self, problems):
+        return tuple(p.expr for p in problems)
+
+    def schedule(self, round_id, problems):
+        if self.pending is not None:
+            self.pending.cancel()
+        self.pending_round = round_id
+        self.pending = get_executor().submit(self.render, self.labels_for(problems))
+
+    def take(self, round_id, problems):
+        future, self.pending = self.pending, None
+        if future is not None and self.pending_round == round_id:
+            if future.done():
+                surf = self.result(future)
+                if surf is not None:
+                    self.hits += 1
+                    return surf
+            elif not future.cancel():
+                # Already half-way through on the worker; finishing it is
+                # never slower than starting over on this thread.
+                surf = self.result(future)
+                if surf is not None:
+                    self.waits += 1
+                    return surf
+        elif future is not None:
+            future.cancel()
+        self.fallbacks += 1
+        return self.render(self.labels_for(problems))
+
+    def result(self, future):
+        # A render that failed on the worker is simply redone here; if it
+        # fails again, at least the error comes from this thread.
+        try:
+            return future.result()
+        except Exception:
+            return None
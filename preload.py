@@ -0,0 +1,135 @@
+import contextlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pygame
+
+import assets
+from asset_cache import ASSET_CACHE, render_seeded, surface_flags, surface_to_bytes
+
+PRELOAD_WORKERS = int(os.environ.get("ANGKA_PRELOAD_WORKERS", str(min(8, os.cpu_count() or 1))))
+# Renders the manifest once more in this process first, only to time it
+# against the pool; off by default since it doubles the startup work.
+PRELOAD_COMPARE = os.environ.get("ANGKA_PRELOAD_COMPARE", "0") not in ("", "0")
+# Seconds lost spawning workers before their first job runs. The pool is
+# only started when the serial estimate for the remaining work is longer.
+PRELOAD_SPAWN_COST = float(os.environ.get("ANGKA_PRELOAD_SPAWN_COST", "1.0"))
+# Spawned workers re-import the parent's main module before they run
+# anything, so they have to inherit a headless, silent environment.
+WORKER_ENV = {
+    "SDL_VIDEODRIVER": "dummy",
+    "SDL_AUDIODRIVER": "dummy",
+    "ANGKA_SOUND": "0",
+    "ANGKA_PROFILE": "0",
+    "ANGKA_TELEMETRY": "",
+    "PYGAME_HIDE_SUPPORT_PROMPT": "1",
+}
+
+class PreloadReport:
+    def __init__(self, count, workers, wall, serial=None):
+        self.count = count
+        self.workers = workers
+        self.wall = wall
+        self.serial = serial
+
+    def __str__(self):
+        where = f"on {self.workers} processes" if self.workers > 1 else "in-process"
+        text = f"preloaded {self.count} assets {where} in {self.wall:.2f} s"
+        if self.serial is None:
+            return text
+        speedup = self.serial / self.wall if self.wall else 0.0
+        return f"{text} (serial run {self.serial:.2f} s, {speedup:.1f}x)"
+
+@contextlib.contextmanager
+def worker_environment():
+    saved = {name: os.environ.get(name) for name in WORKER_ENV}
+    os.environ.update(WORKER_ENV)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def init_worker():
+    pygame.display.init()
+    pygame.display.set_mode((1, 1))
+
+def render_job(func, args, seed, scale):
+    with assets.render_scale(scale):
+        surf = render_seeded(func, args, {}, seed)
+    w, h = surf.get_size()
+    return surface_to_bytes(surf), w, h, surface_flags(surf)
+
+def time_serial(jobs, scale):
+    start = time.perf_counter()
+    for func, args, seed in jobs:
+        render_job(func, args, seed, scale)
+    return time.perf_counter() - start
+
+def preload_serial(jobs, scale, progress=None, done=0, total=None):
+    total = done + len(jobs) if total is None else total
+    for func, args, seed in jobs:
+        ASSET_CACHE.preload(func, args, {}, seed, *render_job(func, args, seed, scale))
+        done += 1
+        if progress:
+            progress(done, total)
+
+def preload_pool(jobs, scale, workers, progress=None, done=0, total=None):
+    # Returns the jobs that did not come back, for the serial fallback.
+    total = done + len(jobs) if total is None else total
+    left = list(jobs)
+    # Spawned, not forked: the parent already has SDL running.
+    context = multiprocessing.get_context("spawn")
+    try:
+        with worker_environment(), ProcessPoolExecutor(workers, mp_context=context, initializer=init_worker) as pool:
+            futures = {pool.submit(render_job, func, args, seed, scale): (func, args, seed)
+                       for func, args, seed in jobs}
+            for future in as_completed(futures):
+                pixels, w, h, flags = future.result()
+                job = futures[future]
+                ASSET_CACHE.preload(job[0], job[1], {}, job[2], pixels, w, h, flags)
+                left.remove(job)
+                done += 1
+                if progress:
+                    progress(done, total)
+    except Exception:
+        # A worker that cannot start or render (no spawn support, a broken
+        # pool, a crash in a generator) must not stop the game starting.
+        pass
+    return left
+
+def preload_assets(manifest, progress=None, workers=PRELOAD_WORKERS, compare=PRELOAD_COMPARE):
+    # manifest: (generator, args, seed) triples, largest first so the long
+    # jobs start right away. Anything already cached is skipped. The rest
+    # is rendered up front and handed to the asset cache as raw RGBA bytes,
+    # so the later cached_asset calls find it ready. The largest job is
+    # rendered right here first; if its time says the rest would outlast
+    # spawning, and there are spare cores, the rest goes to worker processes.
+    missing = [job for job in manifest if not ASSET_CACHE.contains(job[0], job[1], {}, job[2])]
+    if not missing:
+        return None
+    total = len(missing)
+    scale = assets.current_render_scale()
+    start = time.perf_counter()
+    if progress:
+        progress(0, total)
+    preload_serial(missing[:1], scale, progress, 0, total)
+    rest = missing[1:]
+    estimate = (time.perf_counter() - start) * len(rest)
+    workers = min(workers, len(rest), os.cpu_count() or 1)
+    if estimate < PRELOAD_SPAWN_COST:
+        workers = 1
+
+    serial = None
+    if workers > 1:
+        if compare:
+            serial = time_serial(rest, scale)
+            start = time.perf_counter()
+        rest = preload_pool(rest, scale, workers, progress, 1, total)
+    preload_serial(rest, scale, progress, total - len(rest), total)
+    return PreloadReport(total, workers, time.perf_counter() - start, serial)
@@ -0,0 +1,201 @@
+import csv
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+import pygame
+
+from fonts import get_font
+from registry import REGISTRY
+
+PHASES = ("wait", "events", "update", "draw", "blur", "present")
+HISTORY = 240
+HITCH_FACTOR = 1.5
+CSV_FLUSH_FRAMES = 60
+GRAPH_HEIGHT = 70
+MEMORY_ROWS = 3
+OVERLAY_SIZE = (240, 124 + 14 * (MEMORY_ROWS + 1))
+TOGGLE_KEY = pygame.K_F3
+
+PROFILE_ENABLED = os.environ.get("ANGKA_PROFILE", "0") not in ("", "0")
+# Frame data is only written to disk when a file is named explicitly.
+PROFILE_CSV = os.environ.get("ANGKA_PROFILE_CSV", "")
+
+class FrameProfiler:
+    def __init__(self, budget_ms=1000 / 60, csv_path=PROFILE_CSV):
+        self.enabled = False
+        self.budget_ns = int(budget_ms * 1_000_000)
+        self.csv_path = csv_path
+        self.csv_file = None
+        self.writer = None
+        self.main_thread = threading.get_ident()
+
+        self.frame_index = 0
+        self.start_ns = time.perf_counter_ns()
+        self.frame_start = None
+        self.last_mark = 0
+        self.phase_ns = dict.fromkeys(PHASES, 0)
+        self.asset_calls = []
+        self.asset_depth = 0
+
+        self.history = deque(maxlen=HISTORY)
+        self.hitches = deque(maxlen=HISTORY)
+        self.last_hitch = None
+        self.overlay = None
+        self.overlay_rect = pygame.Rect(0, 0, *OVERLAY_SIZE)
+        # label -> callable returning a short text, shown on one line
+        self.counters = {}
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        self.frame_start = None
+        if enabled and self.writer is None and self.csv_path:
+            self.csv_file = open(self.csv_path, "w", newline="")
+            self.writer = csv.writer(self.csv_file)
+            self.writer.writerow(["frame", "t_ms"] + [f"{p}_ms" for p in PHASES] +
+                                 ["work_ms", "asset_ms", "asset_calls", "hitch", "hitch_asset", "hitch_asset_ms"])
+        elif not enabled and self.csv_file is not None:
+            self.csv_file.flush()
+
+    def toggle(self):
+        self.enable(not self.enabled)
+
+    def close(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.writer = None
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.frame_start = self.last_mark = time.perf_counter_ns()
+        self.asset_calls.clear()
+        for phase in PHASES:
+            self.phase_ns[phase] = 0
+
+    def mark(self, phase):
+        if self.frame_start is None:
+            return
+        now = time.perf_counter_ns()
+        self.phase_ns[phase] += now - self.last_mark
+        self.last_mark = now
+
+    def cancel_frame(self):
+        self.frame_start = None
+        self.asset_calls.clear()
+
+    def record_asset(self, name, elapsed_ns, depth):
+        self.asset_calls.append((name, elapsed_ns, depth))
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        work_ns = sum(self.phase_ns.values()) - self.phase_ns["wait"]
+        top_level = [(ns, name) for name, ns, depth in self.asset_calls if depth == 0]
+        asset_ns = sum(ns for ns, _ in top_level)
+
+        hitch = work_ns > self.budget_ns * HITCH_FACTOR
+        culprit, culprit_ns = "", 0
+        if hitch and top_level:
+            culprit_ns, culprit = max(top_level)
+        if hitch:
+            self.last_hitch = (self.frame_index, work_ns, culprit, culprit_ns)
+
+        self.history.append(work_ns)
+        self.hitches.append(hitch)
+
+        if self.writer is not None:
+            row = [self.frame_index, round((self.frame_start - self.start_ns) / 1e6, 3)]
+            row += [round(self.phase_ns[p] / 1e6, 3) for p in PHASES]
+            row += [round(work_ns / 1e6, 3), round(asset_ns / 1e6, 3), len(self.asset_calls),
+                    int(hitch), culprit, round(culprit_ns / 1e6, 3)]
+            self.writer.writerow(row)
+            if self.frame_index % CSV_FLUSH_FRAMES == 0:
+                self.csv_file.flush()
+
+        self.frame_index += 1
+        self.frame_start = None
+        self.asset_calls.clear()
+
+    def percentile(self, q):
+        if not self.history:
+            return 0
+        ordered = sorted(self.history)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def draw_overlay(self, surf, topleft):
+        if self.overlay is None:
+            self.overlay = pygame.Surface(OVERLAY_SIZE, pygame.SRCALPHA)
+        ov = self.overlay
+        w, h = OVERLAY_SIZE
+        ov.fill((0, 0, 0, 170))
+
+        graph_top, graph_h = 34, GRAPH_HEIGHT
+        scale = graph_h / (self.budget_ns * 2)
+        budget_y = graph_top + graph_h - int(self.budget_ns * scale)
+        pygame.draw.line(ov, (80, 200, 80), (0, budget_y), (w, budget_y))
+        for i, (ns, hitch) in enumerate(zip(self.history, self.hitches)):
+            x = w - len(self.history) + i
+            bar = min(graph_h, int(ns * scale))
+            color = (255, 70, 70) if hitch else (230, 230, 230)
+            pygame.draw.line(ov, color, (x, graph_top + graph_h), (x, graph_top + graph_h - bar))
+            if hitch:
+                pygame.draw.line(ov, (255, 70, 70), (x, graph_top), (x, graph_top + 3))
+
+        font = get_font("monospace", 12)
+        p50, p99 = self.percentile(0.5) / 1e6, self.percentile(0.99) / 1e6
+        ov.blit(font.render(f"p50 {p50:5.2f} ms  p99 {p99:5.2f} ms", True, (255, 255, 255)), (4, 2))
+        if self.last_hitch:
+            frame, ns, culprit, culprit_ns = self.last_hitch
+            cause = f"{culprit} {culprit_ns / 1e6:.1f} ms" if culprit else "no asset call"
+            text = f"hitch #{frame} {ns / 1e6:.1f} ms: {cause}"
+            ov.blit(font.render(text, True, (255, 140, 140)), (4, 16))
+
+        y = graph_top + graph_h + 6
+        mb = 1024 * 1024
+        text = (f"assets {REGISTRY.live_bytes / mb:.1f}/{REGISTRY.budget_bytes / mb:.0f} MB  "
+                f"{len(REGISTRY.entries)} live  {REGISTRY.evicted} evicted")
+        ov.blit(font.render(text, True, (180, 220, 255)), (4, y))
+        for owner, (count, nbytes) in REGISTRY.categories()[:MEMORY_ROWS]:
+            y += 14
+            name = owner[5:] if owner.startswith("draw_") else owner
+            ov.blit(font.render(f"  {name[:18]:<18} {count:>3} {nbytes / mb:5.1f} MB", True, (200, 200, 200)), (4, y))
+        if self.counters:
+            y += 14
+            text = "  ".join(f"{label} {counter()}" for label, counter in self.counters.items())
+            ov.blit(font.render(text, True, (220, 220, 160)), (4, y))
+
+        self.overlay_rect.topleft = topleft
+        surf.blit(ov, self.overlay_rect)
+        return self.overlay_rect
+
+PROFILER = FrameProfiler()
+if PROFILE_ENABLED:
+    PROFILER.enable()
+
+def timed_asset(func):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = PROFILER
+        REGISTRY.push_owner(name)
+        try:
+            # Prefetch workers render off the frame path; only main-thread
+            # calls can stall a frame.
+            if not profiler.enabled or threading.get_ident() != profiler.main_thread:
+                return func(*args, **kwargs)
+            depth = profiler.asset_depth
+            profiler.asset_depth = depth + 1
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.asset_depth = depth
+                profiler.record_asset(name, time.perf_counter_ns() - start, depth)
+        finally:
+            REGISTRY.pop_owner()
+    return wrapper
@@ -0,0 +1,147 @@
+import numpy as np
+
+from engine import Engine, BOTTOM_H, BIN_H, COIN_SIZE, FAST_DROP_MULT, MOVE_SPEED
+
+RAIN_MODE = "RAIN"
+RAIN_COINS = 500
+RAIN_DURATION = 60.0
+RAIN_HITS_PER_ROUND = 10
+RAIN_SPEED_SPREAD = 0.25
+
+class CoinStore:
+    # Struct-of-arrays: one contiguous array per field, live coins packed
+    # at the front, so every update is a handful of whole-array operations.
+    def __init__(self, capacity):
+        self.count = 0
+        self.x = np.zeros(capacity, np.float32)
+        self.y = np.zeros(capacity, np.float32)
+        self.prev_x = np.zeros(capacity, np.float32)
+        self.prev_y = np.zeros(capacity, np.float32)
+        self.vy = np.zeros(capacity, np.float32)
+        self.value = np.zeros(capacity, np.int16)
+        self.fields = (self.x, self.y, self.prev_x, self.prev_y, self.vy, self.value)
+
+    @property
+    def capacity(self):
+        return len(self.x)
+
+    def spawn(self, x, y, vy, value):
+        n = min(len(x), self.capacity - self.count)
+        s = slice(self.count, self.count + n)
+        self.x[s] = self.prev_x[s] = x[:n]
+        self.y[s] = self.prev_y[s] = y[:n]
+        self.vy[s] = vy[:n]
+        self.value[s] = value[:n]
+        self.count += n
+        return n
+
+    def keep(self, mask):
+        n = self.count
+        kept = int(mask.sum())
+        for field in self.fields:
+            field[:kept] = field[:n][mask]
+        self.count = kept
+
+    def view(self, field):
+        return field[:self.count]
+
+class RainEngine(Engine):
+    # A timed mode with hundreds of coins at once. Left/right pushes every
+    # coin, and each one lands in whichever sack is under it.
+    def __init__(self, allowed_ops, difficulty, rng=None, clock=None, coins=RAIN_COINS, **kwargs):
+        self.coins = CoinStore(coins)
+        self.time_limit = RAIN_DURATION
+        self.spawn_debt = 0.0
+        self.round_hits = 0
+        super().__init__(allowed_ops, difficulty, rng=rng, clock=clock, **kwargs)
+        self.np_rng = np.random.default_rng(self.rng.getrandbits(63))
+
+    @property
+    def time_left(self):
+        return max(0.0, self.time_limit - self.elapsed)
+
+    def spawn_rain(self, dt):
+        # Spawning at capacity / fall time keeps the screen close to full.
+        fall_time = (self.height + COIN_SIZE) / self.fall_speed
+        self.spawn_debt += self.coins.capacity / fall_time * dt
+        n = min(int(self.spawn_debt), self.coins.capacity - self.coins.count)
+        if n <= 0:
+            return
+        self.spawn_debt -= n
+        rng = self.np_rng
+        answers = np.array([p.answer for p in self.problems], np.int16)
+        self.coins.spawn(
+            rng.uniform(0, self.width - COIN_SIZE, n).astype(np.float32),
+            rng.uniform(-COIN_SIZE * 3, -COIN_SIZE, n).astype(np.float32),
+            (self.fall_speed * rng.uniform(1 - RAIN_SPEED_SPREAD, 1 + RAIN_SPEED_SPREAD, n)).astype(np.float32),
+            answers[rng.integers(0, len(answers), n)],
+        )
+
+    def check_rain_hits(self):
+        coins = self.coins
+        x, prev_y, y = coins.view(coins.x), coins.view(coins.prev_y), coins.view(coins.y)
+        value = coins.view(coins.value)
+
+        bin_w = self.width // self.bin_count
+        band_top = self.height - BOTTOM_H + (BOTTOM_H - BIN_H) // 2
+        band_bottom = band_top + BIN_H
+        half = COIN_SIZE / 2
+
+        # Same test as the single-coin path: the centre's path this step
+        # must cross the band, and its x must be inside a sack (bins sit
+        # 8 px in from each edge of their column).
+        cx = x + half
+        crossed = (y + half >= band_top) & (prev_y + half <= band_bottom)
+        column = (cx // bin_w).astype(np.int32)
+        inset = cx - column * bin_w
+        hit = crossed & (inset >= 8) & (inset <= bin_w - 8) & (column >= 0) & (column < self.bin_count)
+        missed = ~hit & (y > self.height)
+
+        if hit.any():
+            answers = np.array([p.answer for p in self.problems], np.int16)
+            right = value[hit] == answers[column[hit]]
+            correct = int(right.sum())
+            wrong = len(right) - correct
+            self.score += correct
+            self.round_hits += correct
+            for _ in range(correct):
+                self.emit("correct")
+            for _ in range(wrong):
+                self.emit("wrong")
+        for _ in range(int(missed.sum())):
+            self.emit("missed")
+        coins.keep(~(hit | missed))
+
+        if self.round_hits >= RAIN_HITS_PER_ROUND:
+            self.round_hits = 0
+            previous = np.array([p.answer for p in self.problems], np.int16)
+            self.make_problems_and_bins()
+            self.relabel_coins(previous)
+
+    def relabel_coins(self, previous):
+        # Coins still falling carry the old round's answers. Each takes the
+        # new answer of the bin its old one matched, so the mix on screen
+        # stays winnable. A round's answers are distinct, so this is exact.
+        value = self.coins.view(self.coins.value)
+        if not len(value):
+            return
+        answers = np.array([p.answer for p in self.problems], np.int16)
+        slot = np.argmax(value[:, None] == previous, axis=1)
+        value[:] = answers[slot]
+
+    def step(self, dt, move_dir=0, fast_drop=False):
+        self.elapsed += dt
+        self.spawn_rain(dt)
+
+        coins = self.coins
+        x, y = coins.view(coins.x), coins.view(coins.y)
+        coins.view(coins.prev_x)[:] = x
+        coins.view(coins.prev_y)[:] = y
+        if move_dir:
+            x += move_dir * MOVE_SPEED * dt
+            np.clip(x, 0, self.width - COIN_SIZE, out=x)
+        y += coins.view(coins.vy) * ((FAST_DROP_MULT if fast_drop else 1) * dt)
+        self.check_rain_hits()
+
+    def is_game_over(self):
+        return self.elapsed >= self.time_limit
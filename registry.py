@@ -0,0 +1,116 @@
+import os
+import sys
+import threading
+import time
+import weakref
+
+ASSET_BUDGET_BYTES = int(float(os.environ.get("ANGKA_ASSET_BUDGET_MB", "64")) * 1024 * 1024)
+
+class AssetEntry:
+    def __init__(self, ref, nbytes, owner, last_use):
+        self.ref = ref
+        self.nbytes = nbytes
+        self.owner = owner
+        self.last_use = last_use
+        self.drop = None
+
+class AssetRegistry:
+    # Holds every generated surface weakly, so an entry lives exactly as
+    # long as somebody still uses the pixels. Caches that can rebuild an
+    # asset register the slot holding it; over budget, the least recently
+    # used of those slots are emptied first. Only the main thread evicts:
+    # the caches are read there without a lock, so a render on the
+    # prefetch worker just leaves the overage for the next frame.
+    def __init__(self, budget_bytes=ASSET_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.entries = {}
+        self.live_bytes = 0
+        self.evicted = 0
+        self.lock = threading.RLock()
+        self.local = threading.local()
+
+    def push_owner(self, name):
+        owners = getattr(self.local, "owners", None)
+        if owners is None:
+            owners = self.local.owners = []
+        owners.append(name)
+
+    def pop_owner(self):
+        self.local.owners.pop()
+
+    def current_owner(self):
+        # The outermost generator owns whatever its helpers produce.
+        owners = getattr(self.local, "owners", None)
+        return owners[0] if owners else "untracked"
+
+    def record(self, surface, owner=None):
+        key = id(surface)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.ref() is surface:
+                return surface
+            nbytes = surface.get_pitch() * surface.get_height()
+            ref = weakref.ref(surface, lambda _, key=key: self.forget(key))
+            self.entries[key] = AssetEntry(ref, nbytes, owner or self.current_owner(), time.monotonic())
+            self.live_bytes += nbytes
+        self.enforce_budget()
+        return surface
+
+    def forget(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.live_bytes -= entry.nbytes
+
+    def lookup(self, surface):
+        entry = self.entries.get(id(surface))
+        return entry if entry is not None and entry.ref() is surface else None
+
+    def touch(self, surface):
+        entry = self.lookup(surface)
+        if entry is not None:
+            entry.last_use = time.monotonic()
+
+    def evictable(self, surface, cache, key):
+        # cache[key] is the cache's own reference: the surface itself, or
+        # the object it hands out that holds the surface.
+        entry = self.lookup(surface)
+        if entry is not None:
+            entry.drop = (cache, key)
+
+    def enforce_budget(self):
+        if self.live_bytes <= self.budget_bytes or threading.current_thread() is not threading.main_thread():
+            return
+        with self.lock:
+            candidates = sorted((e for e in self.entries.values() if e.drop), key=lambda e: e.last_use)
+        for entry in candidates:
+            if self.live_bytes <= self.budget_bytes:
+                break
+            drop = entry.drop
+            if drop is None:
+                continue
+            cache, key = drop
+            held = cache.pop(key, None)
+            if held is None:
+                entry.drop = None
+                continue
+            # Still in use outside the cache (the background a game is
+            # drawing, say): emptying the slot would free nothing and make
+            # the next lookup render a duplicate, so it goes back. `held`
+            # and getrefcount's own argument account for two references.
+            if sys.getrefcount(held) > 2:
+                cache.setdefault(key, held)
+                continue
+            entry.drop = None
+            del held
+            self.evicted += 1
+
+    def categories(self):
+        totals = {}
+        with self.lock:
+            for entry in self.entries.values():
+                count, nbytes = totals.get(entry.owner, (0, 0))
+                totals[entry.owner] = (count + 1, nbytes + entry.nbytes)
+        return sorted(totals.items(), key=lambda item: -item[1][1])
+
+REGISTRY = AssetRegistry()
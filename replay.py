@@ -0,0 +1,222 @@
+import argparse
+import csv
+import os
+import random
+import struct
+import time
+
+import pygame
+
+MAGIC = b"AAR1"
+LOG_VERSION = 1
+HEADER = struct.Struct("<4sBQ")
+TICK = struct.Struct("<BH")
+MOUSE = struct.Struct("<Bhh")
+KEYS = struct.Struct("<BB")
+EVENTS = struct.Struct("<BH")
+EVENT = struct.Struct("<Bihh")
+
+TAG_TICK, TAG_MOUSE, TAG_KEYS, TAG_EVENTS = b"TMKE"
+HELD_KEYS = (pygame.K_LEFT, pygame.K_RIGHT, pygame.K_DOWN)
+EVENT_CODES = {pygame.QUIT: 0, pygame.MOUSEBUTTONDOWN: 1, pygame.KEYDOWN: 2, pygame.KEYUP: 3}
+EVENT_TYPES = {code: kind for kind, code in EVENT_CODES.items()}
+
+class LiveInput:
+    def __init__(self, clock, seed=None):
+        self.clock = clock
+        self.seed = seed if seed is not None else random.getrandbits(63)
+        self.waited = []
+
+    def tick(self, fps):
+        return self.clock.tick(fps) / 1000.0
+
+    def wait(self, timeout_ms):
+        # Sleeps until there is input (or the timeout runs out); whatever
+        # woke it is handed out by the next events() call.
+        event = pygame.event.wait(timeout_ms)
+        if event.type != pygame.NOEVENT:
+            self.waited.append(event)
+
+    def mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+    def events(self):
+        events, self.waited = self.waited + pygame.event.get(), []
+        return events
+
+    def held(self):
+        pressed = pygame.key.get_pressed()
+        return {key: bool(pressed[key]) for key in HELD_KEYS}
+
+    def close(self):
+        pass
+
+class Recorder(LiveInput):
+    # Every call the loops make is written as one tagged record, so a
+    # replay only has to answer the same calls in the same order.
+    def __init__(self, clock, path, seed=None):
+        super().__init__(clock, seed)
+        self.file = open(path, "wb")
+        self.file.write(HEADER.pack(MAGIC, LOG_VERSION, self.seed))
+
+    def tick(self, fps):
+        # clock.tick is whole milliseconds, so this loses nothing.
+        ms = min(0xFFFF, self.clock.tick(fps))
+        self.file.write(TICK.pack(TAG_TICK, ms))
+        return ms / 1000.0
+
+    def mouse_pos(self):
+        pos = super().mouse_pos()
+        self.file.write(MOUSE.pack(TAG_MOUSE, *pos))
+        return pos
+
+    def events(self):
+        # Only the input that moves the game is logged; window events such
+        # as WINDOWEXPOSED still reach the loop, they just repaint.
+        events = super().events()
+        logged = [e for e in events if e.type in EVENT_CODES]
+        self.file.write(EVENTS.pack(TAG_EVENTS, len(logged)))
+        for e in logged:
+            code = getattr(e, "key", getattr(e, "button", 0))
+            x, y = getattr(e, "pos", (0, 0))
+            self.file.write(EVENT.pack(EVENT_CODES[e.type], code, x, y))
+        return events
+
+    def held(self):
+        held = super().held()
+        bits = sum(1 << i for i, key in enumerate(HELD_KEYS) if held[key])
+        self.file.write(KEYS.pack(TAG_KEYS, bits))
+        return held
+
+    def close(self):
+        self.file.close()
+
+class ReplayDesync(Exception):
+    pass
+
+class Player:
+    def __init__(self, clock, path, realtime=False):
+        self.clock = clock
+        self.realtime = realtime
+        with open(path, "rb") as f:
+            self.data = f.read()
+        magic, version, self.seed = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != LOG_VERSION:
+            raise ValueError(f"{path} is not a replay log")
+        self.offset = HEADER.size
+        self.last_tick = None
+        self.frames = []
+
+    def read(self, record, tag):
+        if self.offset >= len(self.data):
+            return None
+        if self.data[self.offset] != tag:
+            raise ReplayDesync(f"expected {chr(tag)!r} at byte {self.offset}, log has {chr(self.data[self.offset])!r}")
+        values = record.unpack_from(self.data, self.offset)
+        self.offset += record.size
+        return values[1:]
+
+    def tick(self, fps):
+        if self.realtime:
+            self.clock.tick(fps)
+        now = time.perf_counter()
+        values = self.read(TICK, TAG_TICK)
+        dt = values[0] / 1000.0 if values else 1.0 / fps
+        if self.last_tick is not None:
+            self.frames.append((dt, now - self.last_tick))
+        self.last_tick = now
+        return dt
+
+    def wait(self, timeout_ms):
+        pass
+
+    def mouse_pos(self):
+        values = self.read(MOUSE, TAG_MOUSE)
+        return values if values else (0, 0)
+
+    def events(self):
+        # Keep the window responsive; only a real close request gets through.
+        live = [e for e in pygame.event.get() if e.type == pygame.QUIT]
+        values = self.read(EVENTS, TAG_EVENTS)
+        if values is None:
+            return [pygame.event.Event(pygame.QUIT)]
+        events = []
+        for _ in range(values[0]):
+            code, key, x, y = EVENT.unpack_from(self.data, self.offset)
+            self.offset += EVENT.size
+            kind = EVENT_TYPES[code]
+            if kind == pygame.MOUSEBUTTONDOWN:
+                events.append(pygame.event.Event(kind, button=key, pos=(x, y)))
+            elif kind in (pygame.KEYDOWN, pygame.KEYUP):
+                events.append(pygame.event.Event(kind, key=key))
+            else:
+                events.append(pygame.event.Event(kind))
+        return events + live
+
+    def held(self):
+        values = self.read(KEYS, TAG_KEYS)
+        bits = values[0] if values else 0
+        return {key: bool(bits >> i & 1) for i, key in enumerate(HELD_KEYS)}
+
+    def close(self):
+        pass
+
+    def report(self, csv_path=None):
+        if csv_path:
+            with open(csv_path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame", "dt_ms", "wall_ms"])
+                for i, (dt, wall) in enumerate(self.frames):
+                    writer.writerow([i, round(dt * 1000, 3), round(wall * 1000, 3)])
+        walls = sorted(wall for _, wall in self.frames)
+        if not walls:
+            print("no frames replayed")
+            return
+        total = sum(walls)
+        pick = lambda q: walls[min(len(walls) - 1, int(q * len(walls)))] * 1000
+        print(f"frames:     {len(walls)}")
+        print(f"wall time:  {total:.2f} s  ({len(walls) / total:.0f} frames/s)")
+        print(f"frame ms:   mean {total / len(walls) * 1000:.2f}  p50 {pick(0.5):.2f}  "
+              f"p99 {pick(0.99):.2f}  max {walls[-1] * 1000:.2f}")
+        if self.offset < len(self.data):
+            print("replay stopped before the end of the log")
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay a deterministic play session.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--record", metavar="LOG", help="play normally and write the input log")
+    mode.add_argument("--replay", metavar="LOG", help="drive the game from a recorded log")
+    parser.add_argument("--seed", type=int, help="seed for a new recording (default: random)")
+    parser.add_argument("--realtime", action="store_true", help="pace the replay at the recorded frame rate")
+    parser.add_argument("--headless", action="store_true", help="replay without opening a window")
+    parser.add_argument("--timings", metavar="CSV", help="write per-frame replay timings")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="bypass the on-disk asset cache so every run renders the same work")
+    args = parser.parse_args()
+
+    if args.headless:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    if args.no_cache:
+        os.environ["ANGKA_ASSET_CACHE"] = "0"
+
+    import main as game
+    if args.record:
+        source = Recorder(game.clock, args.record, args.seed)
+    else:
+        source = Player(game.clock, args.replay, args.realtime)
+        # Scale switches follow wall-clock frame times, which differ from
+        # run to run; a replay always renders at full size.
+        game.SCALER.enabled = False
+
+    try:
+        game.run(source)
+    finally:
+        source.close()
+        game.shutdown()
+    if args.replay:
+        source.report(args.timings)
+
+if __name__ == "__main__":
+    main()
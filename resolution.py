@@ -0,0 +1,78 @@
+import os
+
+RENDER_SCALES = (1.0, 0.75, 0.5)
+EMA_WEIGHT = 0.1
+DOWNSCALE_FRAMES = 30
+UPSCALE_FRAMES = 180
+UPSCALE_HEADROOM = 0.7
+
+DYNAMIC_RESOLUTION = os.environ.get("ANGKA_DYNAMIC_RES", "1") != "0"
+
+class ResolutionScaler:
+    # Steps down after the smoothed frame time has been over budget for a
+    # while, and only steps back up once the predicted cost at the larger
+    # size fits comfortably. The gap between the two keeps it from
+    # flip-flopping on a frame time that sits right at the budget.
+    #
+    # What a step saves is measured, not assumed: gain[level] is the cost
+    # just before stepping down to `level` over the settled cost after it.
+    # A step that did not make frames cheaper is undone and not retried.
+    def __init__(self, budget_ms=1000 / 60, scales=RENDER_SCALES, enabled=DYNAMIC_RESOLUTION):
+        self.budget_ms = budget_ms
+        self.scales = scales
+        self.enabled = enabled
+        self.level = 0
+        self.gain = [None] * len(scales)
+        self.cost_before = None
+        self.reset()
+
+    @property
+    def scale(self):
+        return self.scales[self.level]
+
+    def reset(self):
+        self.ema = None
+        self.frames = 0
+        self.over = 0
+        self.under = 0
+
+    def record(self, work_ms):
+        if not self.enabled:
+            return False
+        self.ema = work_ms if self.ema is None else self.ema + (work_ms - self.ema) * EMA_WEIGHT
+        self.frames += 1
+
+        if self.cost_before is not None and self.frames >= DOWNSCALE_FRAMES:
+            self.gain[self.level] = self.cost_before / max(self.ema, 1e-6)
+            self.cost_before = None
+            if self.gain[self.level] <= 1.0:
+                return self.step(-1)
+
+        if self.ema > self.budget_ms:
+            self.over += 1
+            self.under = 0
+            smaller = self.level + 1
+            if (self.over >= DOWNSCALE_FRAMES and smaller < len(self.scales)
+                    and (self.gain[smaller] is None or self.gain[smaller] > 1.0)):
+                self.cost_before = self.ema
+                return self.step(1)
+            return False
+
+        self.over = 0
+        if self.level == 0:
+            return False
+        # Until a step down has been measured, cost is taken to follow
+        # pixel count.
+        gain = self.gain[self.level]
+        if gain is None:
+            gain = (self.scales[self.level - 1] / self.scale) ** 2
+        predicted = self.ema * gain
+        self.under = self.under + 1 if predicted < self.budget_ms * UPSCALE_HEADROOM else 0
+        if self.under >= UPSCALE_FRAMES:
+            return self.step(-1)
+        return False
+
+    def step(self, direction):
+        self.level += direction
+        self.reset()
+        return True
@@ -0,0 +1,56 @@
+from collections import OrderedDict
+
+import pygame
+
+from assets import SACK_PAD, draw_sack_body, draw_sack_label, render_scale, scaled_size
+from asset_cache import cached_asset
+from registry import REGISTRY
+
+LABEL_CACHE_SIZE = 256
+
+_labels = OrderedDict()
+
+def sack_label(w, h, label, scale):
+    # Expressions come back often enough (every answer has a handful of
+    # them) that most rounds find their labels already rendered.
+    key = (w, h, label, scale)
+    surf = _labels.get(key)
+    if surf is not None:
+        try:
+            _labels.move_to_end(key)
+        except KeyError:
+            pass  # evicted by another thread in between; still fine to use
+        REGISTRY.touch(surf)
+        return surf
+    with render_scale(scale):
+        surf = _labels[key] = draw_sack_label(w, h, label)
+    REGISTRY.evictable(surf, _labels, key)
+    if len(_labels) > LABEL_CACHE_SIZE:
+        _labels.popitem(last=False)
+    return surf
+
+class SackRow:
+    # Every bin of one size has the same leather body, so it is painted once
+    # and stamped into a base row. A round only copies the row and pastes
+    # its labels on top, however many bins there are.
+    def __init__(self, width, height, bin_rects, scale=1.0):
+        self.rects = list(bin_rects)
+        self.scale = scale
+        bodies = {}
+        with render_scale(scale):
+            for _, _, w, h in self.rects:
+                if (w, h) not in bodies:
+                    bodies[w, h] = cached_asset(draw_sack_body, w, h)
+            size = scaled_size(width, height)
+        self.base = pygame.Surface(size, pygame.SRCALPHA).convert_alpha()
+        self.base.fill((0, 0, 0, 0))
+        self.base.blits([(bodies[w, h], self.origin(x, y)) for x, y, w, h in self.rects])
+
+    def origin(self, x, y):
+        return round((x - SACK_PAD) * self.scale), round((y - SACK_PAD) * self.scale)
+
+    def render(self, bin_labels):
+        surf = self.base.copy()
+        surf.blits([(sack_label(w, h, label, self.scale), self.origin(x, y))
+                    for (x, y, w, h), label in zip(self.rects, bin_labels)])
+        return surf
@@ -0,0 +1,90 @@
+import argparse
+import itertools
+import random
+import time
+
+from engine import Engine, MOVE_SPEED
+
+OP_SETS = {
+    "add": ['+'],
+    "sub": ['-'],
+    "mul": ['*'],
+    "div": ['/'],
+    "all": ['+', '-', '*', '/'],
+}
+
+class Player:
+    def __init__(self, rng, accuracy=0.9, fast_drop=True):
+        self.rng = rng
+        self.accuracy = accuracy
+        self.fast_drop = fast_drop
+        self.coin = None
+        self.target_x = 0
+
+    def pick_target(self, engine, coin):
+        correct = [i for i, p in enumerate(engine.problems) if p.answer == coin.value]
+        wrong = [i for i in range(len(engine.problems)) if i not in correct]
+        if wrong and self.rng.random() > self.accuracy:
+            idx = self.rng.choice(wrong)
+        else:
+            idx = correct[0]
+        x, _, w, _ = engine.bins[idx]
+        return x + w / 2 - coin.w / 2
+
+    def steps(self, engine, dt):
+        while True:
+            coin = engine.falling
+            if coin is None:
+                self.coin = None
+                yield dt, 0, False
+                continue
+            if coin is not self.coin:
+                self.coin = coin
+                self.target_x = self.pick_target(engine, coin)
+            dx = self.target_x - coin.x
+            move_dir = 0
+            if abs(dx) > MOVE_SPEED * dt / 2:
+                move_dir = 1 if dx > 0 else -1
+            yield dt, move_dir, self.fast_drop and move_dir == 0
+
+def simulate(allowed_ops, difficulty, games, dt, accuracy, seed, max_time=600.0):
+    rng = random.Random(seed)
+    totals = {"rounds": 0, "score": 0, "max_level": 0, "sim_time": 0.0}
+    for _ in range(games):
+        engine = Engine(allowed_ops, difficulty, rng=random.Random(rng.getrandbits(32)))
+        rounds = 0
+        def count(engine, event, coin):
+            nonlocal rounds
+            if event in ("correct", "wrong", "missed"):
+                rounds += 1
+        engine.listeners.append(count)
+        engine.run(itertools.islice(Player(rng, accuracy).steps(engine, dt), int(max_time / dt)))
+        totals["rounds"] += rounds
+        totals["score"] += engine.score
+        totals["max_level"] = max(totals["max_level"], engine.speed_level)
+        totals["sim_time"] += engine.elapsed
+    return totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless games for difficulty tuning.")
+    parser.add_argument("--ops", choices=sorted(OP_SETS), default="all")
+    parser.add_argument("--difficulty", choices=["EASY", "MEDIUM", "HARD"], default="MEDIUM")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--dt", type=float, default=0.1, help="simulated seconds per step")
+    parser.add_argument("--accuracy", type=float, default=0.9, help="chance the simulated player picks the right sack")
+    parser.add_argument("--max-time", type=float, default=600.0, help="simulated seconds before a game is cut off")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    totals = simulate(OP_SETS[args.ops], args.difficulty, args.games, args.dt, args.accuracy, args.seed, args.max_time)
+    wall = time.perf_counter() - start
+
+    print(f"games:            {args.games}")
+    print(f"rounds:           {totals['rounds']}  ({totals['rounds'] / wall:.0f} rounds/s)")
+    print(f"mean score:       {totals['score'] / args.games:.2f}")
+    print(f"mean game length: {totals['sim_time'] / args.games:.1f} s simulated")
+    print(f"highest level:    {totals['max_level']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+import pygame
+
+SAMPLE_RATE = 44100
+MIXER_BUFFER = 256
+MASTER_VOLUME = 0.6
+SOUND_ENABLED = os.environ.get("ANGKA_SOUND", "1") != "0"
+
+def pre_init():
+    # Has to run before pygame.init(). A 256-sample buffer is under 6 ms
+    # at 44.1 kHz, so a chime lands on the frame the coin does.
+    pygame.mixer.pre_init(SAMPLE_RATE, -16, 2, MIXER_BUFFER)
+
+def envelope(n, rate, attack=0.005, decay=8.0):
+    t = np.arange(n, dtype=np.float32) / rate
+    env = np.exp(-decay * t)
+    ramp = max(1, int(attack * rate))
+    env[:ramp] *= np.linspace(0, 1, ramp, dtype=np.float32)
+    return env
+
+def note(freq, duration, rate, decay=8.0, harmonics=(1.0,)):
+    n = int(duration * rate)
+    phase = 2 * np.pi * freq * np.arange(n, dtype=np.float32) / rate
+    wave = sum(amp * np.sin(phase * (k + 1)) for k, amp in enumerate(harmonics))
+    return wave * envelope(n, rate, decay=decay)
+
+def synth_chime(rate):
+    bell = (1.0, 0.0, 0.3, 0.0, 0.1)
+    first = note(880, 0.12, rate, decay=18, harmonics=bell)
+    second = note(1320, 0.35, rate, decay=9, harmonics=bell)
+    return np.concatenate([first, second]) * 0.5
+
+def synth_buzz(rate):
+    n = int(0.28 * rate)
+    t = np.arange(n, dtype=np.float32) / rate
+    freq = 110 - 30 * t / t[-1]
+    phase = 2 * np.pi * np.cumsum(freq) / rate
+    # A soft-clipped sawtooth: harsh, but without digital edges.
+    saw = 2 * (phase / (2 * np.pi) % 1.0) - 1
+    return np.tanh(2.5 * saw) * envelope(n, rate, decay=6) * 0.4
+
+def synth_level_up(rate):
+    notes = [note(f, 0.09, rate, decay=12, harmonics=(1.0, 0.25)) for f in (523, 659, 784)]
+    notes.append(note(1047, 0.4, rate, decay=5, harmonics=(1.0, 0.25)))
+    return np.concatenate(notes) * 0.45
+
+def synth_click(rate):
+    n = int(0.03 * rate)
+    noise = np.random.default_rng(0).uniform(-1, 1, n).astype(np.float32)
+    tick = np.sin(2 * np.pi * 2200 * np.arange(n, dtype=np.float32) / rate)
+    return (0.3 * noise + 0.7 * tick) * envelope(n, rate, attack=0.001, decay=220) * 0.35
+
+SYNTHS = {
+    "correct": synth_chime,
+    "wrong": synth_buzz,
+    "level_up": synth_level_up,
+    "hover": synth_click,
+}
+ENGINE_SOUNDS = {"correct": "correct", "wrong": "wrong", "missed": "wrong", "level_up": "level_up"}
+
+def to_sound(wave, channels):
+    pcm = (np.clip(wave, -1, 1) * 32767).astype(np.int16)
+    if channels > 1:
+        pcm = np.repeat(pcm[:, None], channels, axis=1)
+    return pygame.sndarray.make_sound(np.ascontiguousarray(pcm))
+
+class SoundBank:
+    # Everything is synthesized once at startup, and every sound gets its
+    # own reserved channel, so play() is a dict lookup and a channel call:
+    # nothing is allocated while a frame is running. A retrigger restarts
+    # the sound instead of stacking copies, which keeps rain mode sane.
+    def __init__(self, enabled=SOUND_ENABLED):
+        self.sounds = {}
+        self.channels = {}
+        init = pygame.mixer.get_init() if enabled else None
+        if not init or init[1] != -16:
+            return
+        rate, _, channels = init
+        pygame.mixer.set_reserved(len(SYNTHS))
+        for i, (name, synth) in enumerate(SYNTHS.items()):
+            sound = to_sound(synth(rate), channels)
+            sound.set_volume(MASTER_VOLUME)
+            self.sounds[name] = sound
+            self.channels[name] = pygame.mixer.Channel(i)
+
+    def play(self, name):
+        channel = self.channels.get(name)
+        if channel is not None:
+            channel.play(self.sounds[name])
+
+    def on_engine_event(self, engine, event, coin):
+        name = ENGINE_SOUNDS.get(event)
+        if name is not None:
+            self.play(name)
@@ -0,0 +1,185 @@
+import argparse
+import csv
+import json
+import os
+import struct
+import sys
+import threading
+import time
+
+MAGIC = b"AAT1"
+LOG_VERSION = 1
+FILE_HEADER = struct.Struct("<4sBH")
+# session, game, round, landed_at, flight, value, bin_answer, bin_index,
+# outcome, fast_drop, lives, speed_level, difficulty, expression
+RECORD = struct.Struct("<IHIffhhbBBBBB24s")
+FIELDS = ("session", "game", "round", "landed_at", "flight", "value", "bin_answer", "bin_index",
+          "outcome", "fast_drop", "lives", "speed_level", "difficulty", "expression")
+
+OUTCOMES = ("correct", "wrong", "missed")
+DIFFICULTIES = ("EASY", "MEDIUM", "HARD")
+RING_SLOTS = 1024
+FLUSH_INTERVAL = 0.5
+FSYNC_INTERVAL = 5.0
+
+TELEMETRY_PATH = os.environ.get("ANGKA_TELEMETRY", "")
+
+class RecordRing:
+    # Single producer (the game loop), single consumer (the writer thread).
+    # Each side only ever moves its own counter, and the producer bumps
+    # `head` after the slot is filled, so neither side needs a lock. A full
+    # ring drops the record rather than make the game wait.
+    def __init__(self, slots=RING_SLOTS, record=RECORD):
+        self.slots = slots
+        self.size = record.size
+        self.record = record
+        self.buf = bytearray(slots * record.size)
+        self.head = 0
+        self.tail = 0
+        self.dropped = 0
+
+    def push(self, *values):
+        head = self.head
+        if head - self.tail >= self.slots:
+            self.dropped += 1
+            return False
+        self.record.pack_into(self.buf, (head % self.slots) * self.size, *values)
+        self.head = head + 1
+        return True
+
+    def drain(self):
+        head, tail = self.head, self.tail
+        if head == tail:
+            return b""
+        start, end = tail % self.slots, head % self.slots
+        if start < end:
+            data = bytes(self.buf[start * self.size:end * self.size])
+        else:
+            data = bytes(self.buf[start * self.size:]) + bytes(self.buf[:end * self.size])
+        self.tail = head
+        return data
+
+class TelemetryWriter:
+    def __init__(self, path=TELEMETRY_PATH, flush_interval=FLUSH_INTERVAL, fsync_interval=FSYNC_INTERVAL):
+        self.path = path
+        self.enabled = bool(path)
+        self.ring = RecordRing()
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.session = int(time.time())
+        self.game = 0
+        self.engine = None
+        self.file = None
+        self.thread = None
+        self.stop = threading.Event()
+        if not self.enabled:
+            return
+        try:
+            self.file = open(path, "ab")
+            if self.file.tell() == 0:
+                self.file.write(FILE_HEADER.pack(MAGIC, LOG_VERSION, RECORD.size))
+        except OSError:
+            self.enabled = False
+            return
+        self.thread = threading.Thread(target=self.run, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    def on_engine_event(self, engine, event, coin):
+        # Rain mode reports hits in bulk without a coin; those rounds are
+        # not per-coin data and are left out.
+        if coin is None or event not in OUTCOMES:
+            return
+        if engine is not self.engine:
+            self.engine = engine
+            self.game += 1
+        target = ""
+        for problem in engine.problems:
+            if problem.answer == coin.value:
+                target = problem.expr
+                break
+        landed = coin.bin_index is not None and coin.bin_index >= 0
+        self.ring.push(
+            self.session, self.game, engine.round, engine.elapsed, engine.clock() - coin.spawn_time,
+            coin.value, engine.problems[coin.bin_index].answer if landed else -1,
+            coin.bin_index if landed else -1, OUTCOMES.index(event), coin.fast_dropped,
+            max(0, engine.lives), engine.speed_level,
+            DIFFICULTIES.index(engine.difficulty) if engine.difficulty in DIFFICULTIES else 255,
+            target.encode("utf-8"),
+        )
+
+    def run(self):
+        last_sync = time.monotonic()
+        while not self.stop.wait(self.flush_interval):
+            self.flush()
+            if time.monotonic() - last_sync >= self.fsync_interval:
+                self.sync()
+                last_sync = time.monotonic()
+
+    def flush(self):
+        data = self.ring.drain()
+        if data:
+            try:
+                self.file.write(data)
+                self.file.flush()
+            except OSError:
+                pass
+
+    def sync(self):
+        try:
+            os.fsync(self.file.fileno())
+        except OSError:
+            pass
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.stop.set()
+        self.thread.join()
+        self.thread = None
+        self.flush()
+        self.sync()
+        self.file.close()
+
+def read_records(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < FILE_HEADER.size:
+        raise ValueError(f"{path} is not a telemetry log")
+    magic, version, size = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or version != LOG_VERSION or size != RECORD.size:
+        raise ValueError(f"{path} is not a telemetry log (or from another version)")
+    # A crash can leave half a record at the end; it is ignored.
+    end = FILE_HEADER.size + (len(data) - FILE_HEADER.size) // size * size
+    for values in RECORD.iter_unpack(memoryview(data)[FILE_HEADER.size:end]):
+        row = dict(zip(FIELDS, values))
+        row["landed_at"] = round(row["landed_at"], 3)
+        row["flight"] = round(row["flight"], 3)
+        row["outcome"] = OUTCOMES[row["outcome"]]
+        row["fast_drop"] = bool(row["fast_drop"])
+        row["difficulty"] = DIFFICULTIES[row["difficulty"]] if row["difficulty"] < len(DIFFICULTIES) else ""
+        row["expression"] = row["expression"].rstrip(b"\0").decode("utf-8")
+        yield row
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a session telemetry log to CSV or JSON.")
+    parser.add_argument("log", help="telemetry log written with ANGKA_TELEMETRY=<log>")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("-o", "--output", metavar="FILE", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    rows = read_records(args.log)
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump(list(rows), out, indent=2)
+            out.write("\n")
+        else:
+            writer = csv.DictWriter(out, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+if __name__ == "__main__":
+    main()